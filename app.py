@@ -7,11 +7,14 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from datetime import timedelta
+import json
 import os
 from dotenv import load_dotenv
 
 from config.database import db, init_db
 from routes import register_routes
+from utils.auth import init_auth
+from commands import register_commands
 
 # تحميل المتغيرات البيئية
 load_dotenv()
@@ -31,16 +34,41 @@ app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
+app.config['AUTH_USER_CACHE_TTL'] = int(os.getenv('AUTH_USER_CACHE_TTL', 60))  # ثوانٍ - أقصى مدة لظهور تغيير الدور أو التعطيل
+app.config['AUTH_REVOCATION_REFRESH'] = int(os.getenv('AUTH_REVOCATION_REFRESH', 5))  # ثوانٍ - تأخر ظهور تسجيل الخروج في العمليات الأخرى
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))  # كلفة bcrypt - التشفيرات الأقدم يعاد تشفيرها عند الدخول
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 = التنفيذ داخل خيط الطلب
+app.config['PASSWORD_HASH_QUEUE_FACTOR'] = int(os.getenv('PASSWORD_HASH_QUEUE_FACTOR', 4))  # أقصى طلبات معلقة لكل عملية تشفير
+app.config['PASSWORD_HASH_WAIT'] = float(os.getenv('PASSWORD_HASH_WAIT', 2))  # ثوانٍ - انتظار مكان في المجمع قبل الرد بـ 503
 app.config['JSON_AS_ASCII'] = False  # لدعم اللغة العربية
+app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', 300))  # ثوانٍ - شبكة أمان لإبطال الإحصائيات
+app.config['IMPORT_CHUNK_SIZE'] = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))  # حجم دفعة الاستيراد بالجملة
+app.config['ATTENDANCE_PUNCH_BATCH_LIMIT'] = int(os.getenv('ATTENDANCE_PUNCH_BATCH_LIMIT', 10000))  # أقصى عدد بصمات في الطلب الواحد
+app.config['ATTENDANCE_SHIFT_START'] = os.getenv('ATTENDANCE_SHIFT_START', '08:00')  # بداية الدوام
+app.config['ATTENDANCE_LATE_GRACE_MINUTES'] = int(os.getenv('ATTENDANCE_LATE_GRACE_MINUTES', 15))  # فترة السماح قبل احتساب التأخير
+app.config['ATTENDANCE_STANDARD_HOURS'] = float(os.getenv('ATTENDANCE_STANDARD_HOURS', 8))  # ساعات اليوم قبل احتساب العمل الإضافي
+app.config['ATTENDANCE_WEEKMASK'] = os.getenv('ATTENDANCE_WEEKMASK', 'Sun Mon Tue Wed Thu')  # أيام العمل (صيغة numpy weekmask)
+app.config['PRESENCE_REFRESH'] = int(os.getenv('PRESENCE_REFRESH', 2))  # ثوانٍ - تأخر ظهور البصمات في خرائط الحضور للعمليات الأخرى
+app.config['PAYROLL_MONTHLY_HOURS'] = float(os.getenv('PAYROLL_MONTHLY_HOURS', 240))  # ساعات الشهر لحساب سعر الساعة من الراتب
+app.config['PAYROLL_OVERTIME_MULTIPLIER'] = float(os.getenv('PAYROLL_OVERTIME_MULTIPLIER', 1.5))  # معامل أجر ساعة العمل الإضافي
+app.config['PAYROLL_MONTH_DAYS'] = int(os.getenv('PAYROLL_MONTH_DAYS', 30))  # أيام الشهر لحساب أجر اليوم (خصم الإجازات غير المدفوعة)
+app.config['PAYROLL_UNPAID_LEAVE_TYPES'] = os.getenv('PAYROLL_UNPAID_LEAVE_TYPES', 'unpaid,بدون راتب').split(',')  # أنواع الإجازات التي تُخصم من الراتب
+app.config['PAYROLL_ALLOWANCE_RULES'] = json.loads(os.getenv('PAYROLL_ALLOWANCE_RULES', '[]'))  # [{"rate": 0.25} أو {"amount": 500}، مع "department_id" اختياري]
+app.config['PAYROLL_WORKERS'] = int(os.getenv('PAYROLL_WORKERS', 1))  # عمليات حساب الرواتب، 1 = داخل العملية الحالية (الأسرع عادة)
+app.config['DEPARTMENT_BUDGET_MONTHS'] = int(os.getenv('DEPARTMENT_BUDGET_MONTHS', 12))  # عدد الأشهر التي تغطيها ميزانية الإدارة (12 = سنوية)
+app.config['PAYROLL_CURRENCY'] = os.getenv('PAYROLL_CURRENCY', 'SAR')  # عملة ملف التحويل البنكي
+app.config['PAYSLIP_RENDER_WORKERS'] = int(os.getenv('PAYSLIP_RENDER_WORKERS', 1))  # عمليات عرض قسائم الرواتب، 1 = داخل العملية الحالية
 
 # تهيئة الإضافات
 CORS(app)
 db.init_app(app)
 jwt = JWTManager(app)
+init_auth(jwt)
 bcrypt = Bcrypt(app)
 
 # تسجيل المسارات
 register_routes(app)
+register_commands(app)
 
 # مسار الصفحة الرئيسية
 @app.route('/')
@@ -76,9 +104,10 @@ def internal_error(error):
         'message': 'خطأ في الخادم'
     }), 500
 
-# تهيئة قاعدة البيانات
-with app.app_context():
-    init_db()
+# تهيئة قاعدة البيانات (عمليات مجمعات التشفير والحساب تعيد استيراد هذه الوحدة فتتخطاها)
+if __name__ != '__mp_main__':
+    with app.app_context():
+        init_db()
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 3000))
@@ -0,0 +1,83 @@
+"""
+تدرج حساب الرواتب مع عدد العمليات (services.payroll_executor)
+
+لقطة مدخلات اصطناعية بنفس أعمدة load_inputs تُحسب بعدد عمليات 1، 2، 4، ... حتى
+عدد الأنوية، مع التحقق من أن النتيجة مطابقة تماماً لحساب العملية الواحدة.
+
+python benchmarks/payroll_scaling.py [--employees 200000] [--departments 64] [--rules 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.payroll_executor import compute_payroll, freeze  # noqa: E402
+
+
+def synthetic_inputs(employees, departments, seed=0):
+    """لقطة بترتيب رقم الموظف مثل load_inputs"""
+    rng = np.random.default_rng(seed)
+    return freeze({
+        'employee_id': np.arange(1, employees + 1, dtype=np.int64),
+        'department_id': rng.integers(1, departments + 1, employees).astype(np.int64),
+        'salary': np.round(rng.uniform(4000, 40000, employees), 2),
+        'overtime_hours': np.round(rng.exponential(6, employees), 2),
+        'unpaid_days': rng.poisson(0.3, employees).astype(np.float64)
+    })
+
+
+def synthetic_rules(count, departments, seed=0):
+    """قواعد بدلات كثيرة (نسبة أو مبلغ، عامة أو لإدارة) - الجزء الثقيل من الحساب"""
+    rng = np.random.default_rng(seed)
+    allowances = []
+    for i in range(count):
+        rule = {'rate': round(float(rng.uniform(0, 0.05)), 4)} if i % 2 else {'amount': int(rng.integers(50, 500))}
+        if i % 3:
+            rule['department_id'] = int(rng.integers(1, departments + 1))
+        allowances.append(rule)
+    return {'monthly_hours': 240, 'overtime_multiplier': 1.5, 'month_days': 30, 'allowances': allowances}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=200000)
+    parser.add_argument('--departments', type=int, default=64)
+    parser.add_argument('--rules', type=int, default=200, help='عدد قواعد البدلات')
+    parser.add_argument('--repeat', type=int, default=3, help='أفضل زمن من عدد مرات')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='أكبر عدد عمليات (عدد الأنوية افتراضياً)')
+    args = parser.parse_args()
+
+    inputs = synthetic_inputs(args.employees, args.departments)
+    rules = synthetic_rules(args.rules, args.departments)
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    print(f'{args.employees} موظف، {args.departments} إدارة، {args.rules} قاعدة بدل، '
+          f'{os.cpu_count()} نواة')
+    baseline = None
+    reference = None
+    for workers in counts:
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = compute_payroll(inputs, rules, workers)
+            best = min(best, time.perf_counter() - start)
+
+        if reference is None:
+            baseline, reference = best, result
+        identical = all(np.array_equal(result[name], reference[name]) for name in reference)
+        print(f'workers={workers:3d}  {best:8.3f} ث  تسريع ×{baseline / best:5.2f}  مطابق: {identical}')
+        if not identical:
+            raise SystemExit('النتيجة تختلف عن حساب العملية الواحدة')
+
+
+if __name__ == '__main__':
+    main()
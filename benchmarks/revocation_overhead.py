@@ -0,0 +1,88 @@
+"""
+كلفة فحص إلغاء التوكنات (jti) لكل طلب
+
+يقارن فحص النسخة المحلية (RevocationList) مع استعلام قاعدة البيانات في كل طلب،
+ثم يقيس طلباً كاملاً محمياً بـ jwt_required وعدد استعلاماته، مع عدد كبير من
+التوكنات الملغاة في الجدول.
+
+python benchmarks/revocation_overhead.py [--revoked 10000] [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def per_call(function, repeat):
+    """متوسط زمن الاستدعاء بالميكروثانية"""
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--revoked', type=int, default=10000, help='عدد التوكنات الملغاة في الجدول')
+    parser.add_argument('--requests', type=int, default=2000, help='عدد الطلبات المقاسة')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'hr.db')}"
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+
+    from sqlalchemy import event
+
+    from app import app
+    from config.database import db
+    from models.revoked_token import RevokedToken
+    from utils.auth import revoked_tokens
+
+    with app.app_context():
+        expires_at = datetime.utcnow() + timedelta(days=30)
+        db.session.execute(db.insert(RevokedToken), [
+            {'jti': str(uuid.uuid4()), 'user_id': 1, 'expires_at': expires_at, 'revoked_at': datetime.utcnow()}
+            for _ in range(args.revoked)
+        ])
+        db.session.commit()
+
+        jti = str(uuid.uuid4())
+
+        memory = per_call(lambda: jti in revoked_tokens, 100000)
+        database = per_call(lambda: db.session.execute(
+            db.select(RevokedToken.id).where(RevokedToken.jti == jti)
+        ).first(), args.requests)
+
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'email': 'admin@hrms.com', 'password': 'admin123'})
+    headers = {'Authorization': f"Bearer {login.get_json()['data']['token']}"}
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    # طلب أول يملأ الذاكرة المؤقتة للمستخدم والتوكنات الملغاة
+    client.get('/api/auth/me', headers=headers)
+    event.listen(engine, 'before_cursor_execute', record)
+    request_time = per_call(lambda: client.get('/api/auth/me', headers=headers), args.requests)
+    event.remove(engine, 'before_cursor_execute', record)
+    revocation_queries = sum('revoked_tokens' in statement for statement in statements)
+
+    print(f'التوكنات الملغاة في الجدول: {args.revoked} (في الذاكرة: {len(revoked_tokens)})')
+    print(f'فحص النسخة المحلية:      {memory:10.3f} µs/طلب')
+    print(f'استعلام قاعدة البيانات:  {database:10.3f} µs/طلب')
+    print(f'طلب GET /api/auth/me كامل: {request_time:8.1f} µs/طلب')
+    print(f'استعلامات revoked_tokens أثناء {args.requests} طلب: {revocation_queries} '
+          f"(تحديث كل {app.config['AUTH_REVOCATION_REFRESH']} ث)")
+
+
+if __name__ == '__main__':
+    main()
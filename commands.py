@@ -0,0 +1,81 @@
+"""
+أوامر سطر الأوامر (flask <command>) للصيانة الدورية
+"""
+import click
+
+from config.database import db
+
+
+def register_commands(app):
+    """تسجيل أوامر الصيانة"""
+
+    @app.cli.command('reconcile-employee-counts')
+    def reconcile_employee_counts():
+        """مطابقة عدد موظفي الإدارات مع العدد الفعلي (مناسب للتشغيل الدوري عبر cron)"""
+        from models.department import Department
+        from utils.cache import stats_cache
+
+        fixed = Department.recount_employees()
+        if fixed:
+            stats_cache.invalidate()
+        db.session.commit()
+        click.echo(f"✅ تم تصحيح عدد الموظفين في {fixed} إدارة")
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """حذف التوكنات الملغاة التي انتهت صلاحيتها أصلاً"""
+        from datetime import datetime
+        from models.revoked_token import RevokedToken
+
+        result = db.session.execute(
+            db.delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+        )
+        db.session.commit()
+        click.echo(f"✅ تم حذف {result.rowcount} توكن منتهي")
+
+    @app.cli.command('rebuild-attendance-rollups')
+    def rebuild_attendance_rollups():
+        """إعادة بناء ملخص الحضور الشهري من سجلات الحضور"""
+        from services.attendance_rollup import rebuild_rollups
+
+        count = rebuild_rollups()
+        db.session.commit()
+        click.echo(f"✅ تم بناء {count} ملخص شهري")
+
+    @app.cli.command('rebuild-presence')
+    @click.option('--days', default=365, help='عدد الأيام السابقة (بما فيها اليوم)')
+    def rebuild_presence(days):
+        """إعادة بناء لقطات خرائط الحضور المضغوطة للأيام الأخيرة"""
+        from datetime import date, timedelta
+        from services.presence import presence_index
+
+        today = date.today()
+        presence_index.rebuild([today - timedelta(days=i) for i in range(days)])
+        db.session.commit()
+        click.echo(f"✅ تم بناء خرائط الحضور لـ {days} يوم")
+
+    @app.cli.command('rebuild-payroll-rollups')
+    def rebuild_payroll_rollups():
+        """إعادة بناء ملخص تكلفة الرواتب لكل إدارة وشهر"""
+        from services.payroll_rollup import rebuild_rollups
+
+        count = rebuild_rollups()
+        db.session.commit()
+        click.echo(f"✅ تم بناء {count} ملخص رواتب")
+
+    @app.cli.command('generate-payroll')
+    @click.option('--year', type=int, required=True)
+    @click.option('--month', type=int, required=True)
+    def generate_payroll_command(year, month):
+        """توليد رواتب شهر لكل الموظفين النشطين (من سبق توليد راتبه يُتخطى)"""
+        from services.payroll_engine import generate_payroll
+
+        def progress(done, total):
+            click.echo(f"  {done}/{total}")
+
+        run = generate_payroll(year, month, progress=progress)
+        db.session.commit()
+        click.echo(
+            f"✅ تم توليد {run.created_count} راتب (تم تخطي {run.skipped_count}) "
+            f"بإجمالي صافي {run.total_net}"
+        )
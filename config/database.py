@@ -4,9 +4,24 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from datetime import datetime
+import logging
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
+logger = logging.getLogger(__name__)
+
+def ensure_indexes():
+    """إنشاء الفهارس الجديدة على الجداول الموجودة مسبقاً (create_all لا يضيفها)"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+            except Exception as e:
+                # القيود الفريدة تعتمد عليها عبارات ON CONFLICT، فالتشغيل بدونها يكرر البيانات
+                if index.unique:
+                    logger.error('تعذر إنشاء الفهرس الفريد %s: %s', index.name, e)
+                    raise RuntimeError(f'تعذر إنشاء الفهرس الفريد {index.name} (توجد صفوف مكررة؟)') from e
+                logger.warning('تعذر إنشاء الفهرس %s: %s', index.name, e)
 
 def init_db():
     """تهيئة قاعدة البيانات وإنشاء الجداول والبيانات التجريبية"""
@@ -15,6 +30,19 @@ def init_db():
     # إنشاء الجداول
     db.create_all()
     
+    # دمج الحضور المكرر قبل إنشاء القيد الفريد على (الموظف، اليوم) في قاعدة بيانات قديمة
+    if 'uq_attendance_employee_date' not in {index['name'] for index in db.inspect(db.engine).get_indexes('attendance')}:
+        from services.attendance_ingest import merge_duplicate_days
+        removed = merge_duplicate_days()
+        db.session.commit()
+        if removed:
+            logger.warning('تم دمج %s سجل حضور مكرر قبل إنشاء uq_attendance_employee_date', removed)
+    ensure_indexes()
+    
+    # فهرس البحث النصي للموظفين
+    from services.employee_search import ensure_search_index
+    ensure_search_index()
+    
     # التحقق من وجود بيانات
     if User.query.first() is None:
         print("📦 جاري إضافة البيانات التجريبية...\n")
@@ -8,10 +8,17 @@ from models.job_title import JobTitle
 from models.training import TrainingProgram, TrainingEnrollment
 from models.performance import PerformanceReview
 from models.attendance import Attendance
+from models.attendance_punch import AttendancePunch
+from models.attendance_rollup import AttendanceMonthlyRollup
+from models.presence_snapshot import PresenceSnapshot
 from models.leave import LeaveRequest
-from models.payroll import Payroll
+from models.payroll import Payroll, PayrollRun
+from models.payroll_rollup import PayrollDepartmentRollup
+from models.bank_account import EmployeeBankAccount
 from models.notification import Notification
 from models.activity_log import ActivityLog
+from models.cache_generation import CacheGeneration
+from models.revoked_token import RevokedToken
 
 __all__ = [
     'User',
@@ -22,10 +29,18 @@ __all__ = [
     'TrainingEnrollment',
     'PerformanceReview',
     'Attendance',
+    'AttendancePunch',
+    'AttendanceMonthlyRollup',
+    'PresenceSnapshot',
     'LeaveRequest',
     'Payroll',
+    'PayrollRun',
+    'PayrollDepartmentRollup',
+    'EmployeeBankAccount',
     'Notification',
-    'ActivityLog'
+    'ActivityLog',
+    'CacheGeneration',
+    'RevokedToken'
 ]
 
 
@@ -7,6 +7,13 @@ from datetime import datetime, time
 class Attendance(db.Model):
     """سجل الحضور والانصراف"""
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # سجل واحد لكل موظف في اليوم - يمنع التكرار عند الضغط المزدوج ويخدم البحث بالموظف واليوم
+        db.Index('uq_attendance_employee_date', 'employee_id', 'date', unique=True),
+        # نطاقات التاريخ لكل الموظفين وترتيب القائمة (date, id)، والتغييرات منذ آخر تحديث لخرائط الحضور
+        db.Index('ix_attendance_date_id', 'date', 'id'),
+        db.Index('ix_attendance_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -22,6 +29,13 @@ class Attendance(db.Model):
     # العلاقات
     employee = db.relationship('Employee', backref='attendance_records')
     
+    @classmethod
+    def eager_options(cls):
+        """تحميل الموظف مسبقاً لتجنب N+1 في to_dict(include_relations=True)"""
+        return (
+            db.joinedload(cls.employee),
+        )
+    
     def calculate_work_hours(self):
         """حساب ساعات العمل"""
         if self.check_in and self.check_out:
@@ -29,9 +43,9 @@ class Attendance(db.Model):
             check_in_dt = datetime.combine(datetime.today(), self.check_in)
             check_out_dt = datetime.combine(datetime.today(), self.check_out)
             
-            # حساب الفرق بالساعات
+            # حساب الفرق بالساعات (0 إذا كان الخروج قبل الدخول)
             delta = check_out_dt - check_in_dt
-            self.work_hours = round(delta.total_seconds() / 3600, 2)
+            self.work_hours = max(round(delta.total_seconds() / 3600, 2), 0)
     
     def to_dict(self, include_relations=False):
         data = {
@@ -0,0 +1,34 @@
+"""
+نموذج بصمات الحضور
+"""
+from config.database import db
+from datetime import datetime
+
+class AttendancePunch(db.Model):
+    """بصمة خام من أجهزة الحضور - القيد الفريد يجعل إعادة رفع نفس الدفعة بلا أثر"""
+    __tablename__ = 'attendance_punches'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'punched_at', 'direction', name='uq_attendance_punches_employee_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    punched_at = db.Column(db.DateTime, nullable=False)
+    direction = db.Column(db.String(10), nullable=False)  # in, out
+    device_id = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # العلاقات
+    employee = db.relationship('Employee', backref='attendance_punches')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'punched_at': self.punched_at.isoformat() if self.punched_at else None,
+            'direction': self.direction,
+            'device_id': self.device_id
+        }
+    
+    def __repr__(self):
+        return f'<AttendancePunch {self.employee_id} {self.direction} at {self.punched_at}>'
@@ -0,0 +1,40 @@
+"""
+نموذج ملخص الحضور الشهري
+"""
+from config.database import db
+from datetime import datetime
+
+class AttendanceMonthlyRollup(db.Model):
+    """ملخص حضور الموظف لكل شهر - يُحدَّث مع كل تسجيل حضور أو انصراف"""
+    __tablename__ = 'attendance_monthly_rollups'
+    
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    total_days = db.Column(db.Integer, nullable=False, default=0)
+    present_days = db.Column(db.Integer, nullable=False, default=0)
+    absent_days = db.Column(db.Integer, nullable=False, default=0)
+    late_days = db.Column(db.Integer, nullable=False, default=0)
+    total_hours = db.Column(db.Float, nullable=False, default=0)
+    hours_days = db.Column(db.Integer, nullable=False, default=0)  # الأيام التي لها ساعات عمل (لحساب المتوسط)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def avg_hours(self):
+        return self.total_hours / self.hours_days if self.hours_days else 0
+    
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'year': self.year,
+            'month': self.month,
+            'total_days': self.total_days,
+            'present_days': self.present_days,
+            'absent_days': self.absent_days,
+            'late_days': self.late_days,
+            'total_hours': self.total_hours,
+            'avg_hours': self.avg_hours
+        }
+    
+    def __repr__(self):
+        return f'<AttendanceMonthlyRollup {self.employee_id} {self.year}-{self.month:02d}>'
@@ -0,0 +1,27 @@
+"""
+نموذج الحساب البنكي للموظف
+"""
+from config.database import db
+from datetime import datetime
+
+class EmployeeBankAccount(db.Model):
+    """الحساب البنكي الذي يُحوَّل إليه راتب الموظف"""
+    __tablename__ = 'employee_bank_accounts'
+    
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), primary_key=True)
+    bank_name = db.Column(db.String(100))
+    iban = db.Column(db.String(34), nullable=False)
+    account_name = db.Column(db.String(200))  # اسم صاحب الحساب إذا اختلف عن اسم الموظف
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'bank_name': self.bank_name,
+            'iban': self.iban,
+            'account_name': self.account_name
+        }
+    
+    def __repr__(self):
+        return f'<EmployeeBankAccount {self.employee_id}>'
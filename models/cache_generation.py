@@ -0,0 +1,16 @@
+"""
+نموذج أجيال التخزين المؤقت
+"""
+from config.database import db
+from datetime import datetime
+
+class CacheGeneration(db.Model):
+    """عداد جيل لكل مجموعة بيانات مخزنة مؤقتاً - يزداد مع كل كتابة لإبطال النسخ في جميع العمليات"""
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CacheGeneration {self.name}: {self.generation}>'
@@ -24,6 +24,37 @@ class Department(db.Model):
     parent = db.relationship('Department', remote_side=[id], backref='children')
     manager = db.relationship('Employee', foreign_keys=[manager_id], backref='managed_department')
     
+    @classmethod
+    def eager_options(cls):
+        """خيارات تحميل المدير والإدارة الأم مسبقاً"""
+        return (
+            db.joinedload(cls.manager),
+            db.joinedload(cls.parent)
+        )
+    
+    @classmethod
+    def recount_employees(cls, department_ids=None):
+        """
+        مطابقة employee_count مع العدد الفعلي بجملة UPDATE واحدة (استعلام فرعي مرتبط)
+        
+        يعالج أي انحراف في العداد التراكمي، ويعيد عدد الإدارات التي تم تصحيحها
+        """
+        from models.employee import Employee
+        
+        active_count = db.select(db.func.count(Employee.id)).where(
+            Employee.department_id == cls.id,
+            Employee.status == 'active'
+        ).scalar_subquery()
+        
+        statement = db.update(cls).values(employee_count=active_count).where(
+            db.func.coalesce(cls.employee_count, -1) != active_count
+        )
+        if department_ids is not None:
+            statement = statement.where(cls.id.in_(list(department_ids)))
+        
+        result = db.session.execute(statement.execution_options(synchronize_session=False))
+        return result.rowcount
+    
     def to_dict(self, include_relations=False):
         """تحويل إلى قاموس"""
         data = {
@@ -7,6 +7,10 @@ from datetime import datetime
 class Employee(db.Model):
     """نموذج الموظفين - متوافق مع hr.employee في Odoo"""
     __tablename__ = 'employees'
+    __table_args__ = (
+        # فهرس مركب يطابق ترتيب القائمة (created_at DESC, id DESC) للتقسيم بالمؤشر
+        db.Index('ix_employees_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -41,6 +45,18 @@ class Employee(db.Model):
     job_title = db.relationship('JobTitle', backref='employees', foreign_keys=[job_title_id])
     manager = db.relationship('Employee', remote_side=[id], backref='subordinates')
     
+    # الحقول المحسوبة المتاحة في ?fields= مع الأعمدة التي تعتمد عليها
+    computed_fields = {'full_name': ('first_name', 'last_name')}
+    
+    @classmethod
+    def eager_options(cls):
+        """خيارات تحميل العلاقات مسبقاً لتجنب N+1 في to_dict(include_relations=True)"""
+        return (
+            db.joinedload(cls.department),
+            db.joinedload(cls.job_title),
+            db.joinedload(cls.manager)
+        )
+    
     @property
     def full_name(self):
         """الاسم الكامل"""
@@ -87,3 +103,48 @@ class Employee(db.Model):
 
 
 
+
+
+def _counted_department(state, target, previous=False):
+    """الإدارة التي يُحتسب فيها الموظف (فقط إذا كان نشطاً)"""
+    values = {}
+    for attr in ('department_id', 'status'):
+        history = state.attrs[attr].history
+        if previous and history.deleted:
+            values[attr] = history.deleted[0]
+        else:
+            values[attr] = getattr(target, attr)
+    return values['department_id'] if values['status'] == 'active' else None
+
+
+def _adjust_employee_count(connection, department_id, delta):
+    """زيادة/إنقاص عداد الإدارة ذرياً داخل نفس المعاملة"""
+    if not department_id:
+        return
+    from models.department import Department
+    departments = Department.__table__
+    connection.execute(
+        departments.update()
+        .where(departments.c.id == department_id)
+        .values(employee_count=db.func.coalesce(departments.c.employee_count, 0) + delta)
+    )
+
+
+@db.event.listens_for(Employee, 'after_insert')
+def _count_inserted_employee(mapper, connection, target):
+    _adjust_employee_count(connection, _counted_department(db.inspect(target), target), 1)
+
+
+@db.event.listens_for(Employee, 'after_update')
+def _count_updated_employee(mapper, connection, target):
+    state = db.inspect(target)
+    old_department = _counted_department(state, target, previous=True)
+    new_department = _counted_department(state, target)
+    if old_department != new_department:
+        _adjust_employee_count(connection, old_department, -1)
+        _adjust_employee_count(connection, new_department, 1)
+
+
+@db.event.listens_for(Employee, 'after_delete')
+def _count_deleted_employee(mapper, connection, target):
+    _adjust_employee_count(connection, _counted_department(db.inspect(target), target, previous=True), -1)
@@ -7,6 +7,13 @@ from datetime import datetime
 class Payroll(db.Model):
     """سجل الراتب"""
     __tablename__ = 'payroll'
+    __table_args__ = (
+        # راتب واحد لكل موظف في الشهر - يجعل تشغيل الرواتب آمناً عند الإعادة
+        # يخدم أيضاً رواتب الموظف الواحد مرتبة حسب الفترة
+        db.Index('uq_payroll_employee_period', 'employee_id', 'year', 'month', unique=True),
+        # القائمة العامة مرتبة حسب (year, month, id) وفلترة شهر محدد
+        db.Index('ix_payroll_period_id', 'year', 'month', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -29,6 +36,14 @@ class Payroll(db.Model):
     # العلاقات
     employee = db.relationship('Employee', backref='payroll_records')
     
+    @classmethod
+    def eager_options(cls):
+        """تحميل الموظف وإدارته مسبقاً لتجنب N+1 في to_dict(include_relations=True)"""
+        from models.employee import Employee
+        return (
+            db.joinedload(cls.employee).joinedload(Employee.department),
+        )
+    
     def calculate_net_salary(self):
         """حساب الراتب الصافي"""
         self.net_salary = (
@@ -69,4 +84,36 @@ class Payroll(db.Model):
         return f'<Payroll {self.employee_id} - {self.month}/{self.year}>'
 
 
-
+class PayrollRun(db.Model):
+    """عملية توليد رواتب شهر كامل"""
+    __tablename__ = 'payroll_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50), default='running')  # running, completed, failed
+    total_employees = db.Column(db.Integer, default=0)
+    created_count = db.Column(db.Integer, default=0)  # الرواتب المضافة
+    skipped_count = db.Column(db.Integer, default=0)  # الموجودة مسبقاً
+    total_net = db.Column(db.Float, default=0)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'year': self.year,
+            'month': self.month,
+            'status': self.status,
+            'total_employees': self.total_employees,
+            'created_count': self.created_count,
+            'skipped_count': self.skipped_count,
+            'total_net': self.total_net,
+            'created_by': self.created_by,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<PayrollRun {self.month}/{self.year}>'
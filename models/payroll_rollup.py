@@ -0,0 +1,44 @@
+"""
+نموذج ملخص تكلفة الرواتب
+"""
+from config.database import db
+from datetime import datetime
+
+class PayrollDepartmentRollup(db.Model):
+    """مجاميع رواتب الإدارة لكل شهر - تُحدَّث في نفس معاملة كتابة الرواتب"""
+    __tablename__ = 'payroll_department_rollups'
+    __table_args__ = (
+        # اتجاهات كل الإدارات لعدة سنوات (نطاق على الفترة)
+        db.Index('ix_payroll_rollups_period', 'year', 'month'),
+    )
+    
+    department_id = db.Column(db.Integer, primary_key=True)  # 0 = موظفون بدون إدارة
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    headcount = db.Column(db.Integer, nullable=False, default=0)
+    basic_salary = db.Column(db.Float, nullable=False, default=0)
+    allowances = db.Column(db.Float, nullable=False, default=0)
+    bonuses = db.Column(db.Float, nullable=False, default=0)
+    deductions = db.Column(db.Float, nullable=False, default=0)
+    overtime_hours = db.Column(db.Float, nullable=False, default=0)
+    overtime_amount = db.Column(db.Float, nullable=False, default=0)
+    net_salary = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'department_id': self.department_id or None,
+            'year': self.year,
+            'month': self.month,
+            'headcount': self.headcount,
+            'basic_salary': self.basic_salary,
+            'allowances': self.allowances,
+            'bonuses': self.bonuses,
+            'deductions': self.deductions,
+            'overtime_hours': self.overtime_hours,
+            'overtime_amount': self.overtime_amount,
+            'net_salary': self.net_salary
+        }
+    
+    def __repr__(self):
+        return f'<PayrollDepartmentRollup {self.department_id} {self.year}-{self.month:02d}>'
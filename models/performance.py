@@ -7,6 +7,13 @@ from datetime import datetime
 class PerformanceReview(db.Model):
     """تقييم الأداء"""
     __tablename__ = 'performance_reviews'
+    __table_args__ = (
+        # سجل تقييمات الموظف مرتباً حسب التاريخ، وتقييمات المقيّم حسب الحالة
+        db.Index('ix_performance_employee_date', 'employee_id', 'review_date'),
+        db.Index('ix_performance_reviewer_status', 'reviewer_id', 'status'),
+        # القائمة العامة مرتبة حسب (review_date, id)
+        db.Index('ix_performance_date_id', 'review_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -26,6 +33,14 @@ class PerformanceReview(db.Model):
     employee = db.relationship('Employee', foreign_keys=[employee_id], backref='performance_reviews')
     reviewer = db.relationship('Employee', foreign_keys=[reviewer_id], backref='reviewed_employees')
     
+    @classmethod
+    def eager_options(cls):
+        """تحميل الموظف والمقيّم مسبقاً لتجنب N+1 في to_dict(include_relations=True)"""
+        return (
+            db.joinedload(cls.employee),
+            db.joinedload(cls.reviewer)
+        )
+    
     def to_dict(self, include_relations=False):
         data = {
             'id': self.id,
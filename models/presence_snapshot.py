@@ -0,0 +1,18 @@
+"""
+نموذج لقطات الحضور اليومية
+"""
+from config.database import db
+from datetime import datetime
+
+class PresenceSnapshot(db.Model):
+    """خرائط بت مضغوطة (zlib) لحضور يوم كامل - البت رقم N يمثل الموظف رقم N"""
+    __tablename__ = 'presence_snapshots'
+    
+    date = db.Column(db.Date, primary_key=True)
+    present = db.Column(db.LargeBinary, nullable=False)
+    late = db.Column(db.LargeBinary, nullable=False)
+    on_leave = db.Column(db.LargeBinary, nullable=False)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PresenceSnapshot {self.date}>'
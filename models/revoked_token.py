@@ -0,0 +1,18 @@
+"""
+نموذج التوكنات الملغاة
+"""
+from config.database import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """توكنات JWT الملغاة (تسجيل الخروج) - تُحذف بعد انتهاء صلاحية التوكن"""
+    __tablename__ = 'revoked_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
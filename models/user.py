@@ -1,7 +1,8 @@
 """
 نموذج المستخدم
 """
-from config.database import db, bcrypt
+from config.database import db
+from services.password_hasher import password_hasher
 from datetime import datetime
 
 class User(db.Model):
@@ -23,11 +24,14 @@ class User(db.Model):
     
     def set_password(self, password):
         """تشفير كلمة المرور"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash_password(password)
     
     def check_password(self, password):
-        """التحقق من كلمة المرور"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """التحقق من كلمة المرور (مع إعادة التشفير إذا تغيرت كلفة bcrypt)"""
+        valid, new_hash = password_hasher.verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return valid
     
     def to_dict(self):
         """تحويل إلى قاموس"""
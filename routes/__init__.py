@@ -11,6 +11,7 @@ from routes.attendance_routes import attendance_bp
 from routes.training_routes import training_bp
 from routes.performance_routes import performance_bp
 from routes.payroll_routes import payroll_bp
+from routes.system_routes import system_bp
 
 def register_routes(app):
     """تسجيل جميع مسارات API"""
@@ -23,6 +24,7 @@ def register_routes(app):
     app.register_blueprint(training_bp, url_prefix='/api/training')
     app.register_blueprint(performance_bp, url_prefix='/api/performance')
     app.register_blueprint(payroll_bp, url_prefix='/api/payroll')
+    app.register_blueprint(system_bp, url_prefix='/api/system')
     
     print("✅ تم تسجيل جميع مسارات API بنجاح")
 
@@ -1,13 +1,21 @@
 """
 مسارات إدارة الحضور
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_current_user
 from datetime import datetime, date, time
 
 from config.database import db
-from models.user import User
 from models.attendance import Attendance
+from models.employee import Employee
+from services.attendance_ingest import ingest_punches, record_check_in, record_check_out
+from services.attendance_rollup import employee_month_stats, department_month_stats
+from services import presence, attendance_analytics
+from utils.auth import roles_required
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import page_validators
+from utils.pagination import keyset_paginate, InvalidCursor
+from utils.streaming import ndjson_lines
 
 attendance_bp = Blueprint('attendance', __name__)
 
@@ -16,8 +24,7 @@ attendance_bp = Blueprint('attendance', __name__)
 def check_in():
     """تسجيل حضور"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user.employee_id:
             return jsonify({
@@ -25,36 +32,22 @@ def check_in():
                 'message': 'المستخدم غير مرتبط بموظف'
             }), 400
         
-        today = date.today()
-        
-        # التحقق من عدم وجود تسجيل سابق
-        existing = Attendance.query.filter_by(
-            employee_id=current_user.employee_id,
-            date=today
-        ).first()
+        # عبارة واحدة: لا تتكرر السجلات حتى مع الضغط المزدوج المتزامن
+        attendance = record_check_in(current_user.employee_id, datetime.now())
         
-        if existing:
+        if attendance is None:
             return jsonify({
                 'success': False,
                 'message': 'تم تسجيل الحضور مسبقاً لهذا اليوم'
             }), 400
         
-        check_in_time = datetime.now().time()
-        
-        new_attendance = Attendance(
-            employee_id=current_user.employee_id,
-            date=today,
-            check_in=check_in_time,
-            status='present'
-        )
-        
-        db.session.add(new_attendance)
+        data = attendance.to_dict()
         db.session.commit()
         
         return jsonify({
             'success': True,
             'message': 'تم تسجيل الحضور بنجاح',
-            'data': new_attendance.to_dict()
+            'data': data
         }), 201
         
     except Exception as e:
@@ -70,8 +63,7 @@ def check_in():
 def check_out():
     """تسجيل انصراف"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user.employee_id:
             return jsonify({
@@ -79,34 +71,74 @@ def check_out():
                 'message': 'المستخدم غير مرتبط بموظف'
             }), 400
         
-        today = date.today()
+        attendance = record_check_out(current_user.employee_id, datetime.now())
         
-        attendance = Attendance.query.filter_by(
-            employee_id=current_user.employee_id,
-            date=today
-        ).first()
-        
-        if not attendance:
+        if attendance is None:
+            # تحديد السبب فقط عند الفشل
+            exists = db.session.execute(
+                db.select(Attendance.id).filter_by(
+                    employee_id=current_user.employee_id,
+                    date=date.today()
+                )
+            ).first()
+            
+            if not exists:
+                return jsonify({
+                    'success': False,
+                    'message': 'لم يتم العثور على تسجيل حضور لهذا اليوم'
+                }), 404
+            
             return jsonify({
                 'success': False,
-                'message': 'لم يتم العثور على تسجيل حضور لهذا اليوم'
-            }), 404
+                'message': 'تم تسجيل الانصراف مسبقاً'
+            }), 400
         
-        if attendance.check_out:
+        data = attendance.to_dict()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'تم تسجيل الانصراف بنجاح',
+            'data': data
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@attendance_bp.route('/punches', methods=['POST'])
+@jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لرفع بصمات الحضور')
+def ingest_attendance_punches():
+    """استقبال دفعة بصمات من أجهزة الحضور (آمن عند إعادة الإرسال)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        punches = data.get('punches')
+        
+        if not isinstance(punches, list) or not punches:
             return jsonify({
                 'success': False,
-                'message': 'تم تسجيل الانصراف مسبقاً'
+                'message': 'الحقل punches مطلوب (قائمة بصمات)'
             }), 400
         
-        attendance.check_out = datetime.now().time()
-        attendance.calculate_work_hours()
+        limit = current_app.config.get('ATTENDANCE_PUNCH_BATCH_LIMIT', 10000)
+        if len(punches) > limit:
+            return jsonify({
+                'success': False,
+                'message': f'الحد الأقصى للدفعة {limit} بصمة'
+            }), 413
         
+        report = ingest_punches(punches)
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': 'تم تسجيل الانصراف بنجاح',
-            'data': attendance.to_dict()
+            'message': f"تم استلام {report['accepted']} بصمة",
+            'data': report
         }), 200
         
     except Exception as e:
@@ -117,45 +149,149 @@ def check_out():
         }), 500
 
 
+def scoped_attendance_query(query, current_user, args):
+    """
+    تطبيق صلاحيات العرض وفلاتر التاريخ على استعلام الحضور
+
+    يعيد (الاستعلام، رسالة خطأ الصلاحية أو None)
+    """
+    employee_id = args.get('employee_id', type=int)
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    
+    # الصلاحيات
+    if employee_id:
+        if current_user.role in ['admin', 'hr']:
+            query = query.filter(Attendance.employee_id == employee_id)
+        else:
+            return None, 'ليس لديك صلاحية لعرض سجلات موظفين آخرين'
+    else:
+        if current_user.role not in ['admin', 'hr']:
+            query = query.filter(Attendance.employee_id == current_user.employee_id)
+    
+    if start_date:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        query = query.filter(Attendance.date >= start)
+    if end_date:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        query = query.filter(Attendance.date <= end)
+    
+    return query, None
+
 @attendance_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_attendance():
-    """الحصول على سجلات الحضور"""
+    """الحصول على سجلات الحضور (صفحات بالمؤشر على date, id)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
-        employee_id = request.args.get('employee_id', type=int)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+        cursor = request.args.get('cursor')
         
-        query = Attendance.query
+        query, error = scoped_attendance_query(Attendance.query, current_user, request.args)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 403
         
-        # الصلاحيات
-        if employee_id:
-            if current_user.role in ['admin', 'hr']:
-                query = query.filter_by(employee_id=employee_id)
-            else:
-                return jsonify({
-                    'success': False,
-                    'message': 'ليس لديك صلاحية لعرض سجلات موظفين آخرين'
-                }), 403
+        fields = parse_fields(Attendance, request.args.get('fields'))
+        
+        if fields:
+            query = query.options(load_only_option(Attendance, fields, extra=('date', 'updated_at')))
         else:
-            if current_user.role not in ['admin', 'hr']:
-                query = query.filter_by(employee_id=current_user.employee_id)
+            query = query.options(*Attendance.eager_options())
         
-        if start_date and end_date:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.date.between(start, end))
+        records, next_cursor = keyset_paginate(
+            query, [Attendance.date, Attendance.id], cursor=cursor, limit=limit
+        )
         
-        records = query.order_by(Attendance.date.desc()).all()
+        # طلب شرطي: 304 إذا لم تتغير الصفحة (وأسماء موظفيها) منذ آخر نسخة لدى العميل
+        validators = page_validators(
+            records, next_cursor, related=None if fields else lambda record: (record.employee,)
+        )
+        if validators.is_fresh():
+            return validators.not_modified()
         
-        return jsonify({
+        return validators.apply(jsonify({
             'success': True,
-            'data': [record.to_dict(include_relations=True) for record in records]
-        }), 200
+            'data': [
+                serialize(record, fields) if fields else record.to_dict(include_relations=True)
+                for record in records
+            ],
+            'pagination': {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        })), 200
+        
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+STREAM_COLUMNS = ('id', 'employee_id', 'date', 'check_in', 'check_out', 'work_hours', 'status', 'notes')
+
+@attendance_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_attendance():
+    """سجلات الحضور كـ NDJSON متدفق للنطاقات الكبيرة (نفس فلاتر القائمة)"""
+    try:
+        current_user = get_current_user()
+        
+        statement, error = scoped_attendance_query(
+            db.select(
+                *[getattr(Attendance, name) for name in STREAM_COLUMNS],
+                Employee.first_name,
+                Employee.last_name,
+                Employee.employee_number
+            ).join(Employee, Employee.id == Attendance.employee_id),
+            current_user,
+            request.args
+        )
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 403
+        
+        statement = statement.order_by(Attendance.date.desc(), Attendance.id.desc())
+        
+        def batches():
+            # مؤشر من جهة الخادم: الذاكرة ثابتة مهما كان عدد السجلات
+            result = db.session.execute(statement, execution_options={'yield_per': 1000})
+            for partition in result.partitions():
+                batch = []
+                for row in partition:
+                    item = dict(zip(STREAM_COLUMNS, row))
+                    item['employee_name'] = f"{row.first_name} {row.last_name}"
+                    item['employee_number'] = row.employee_number
+                    batch.append(item)
+                yield batch
+        
+        return Response(
+            stream_with_context(ndjson_lines(batches())),
+            mimetype='application/x-ndjson'
+        )
         
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -163,17 +299,30 @@ def get_attendance():
         }), 500
 
 
+def stats_period(args):
+    """(year, month) من معاملات الطلب (الشهر الحالي افتراضياً)، أو None إذا كانت غير صالحة"""
+    today = datetime.now()
+    year = args.get('year', type=int) or today.year
+    month = args.get('month', type=int) or today.month
+    if not 1 <= month <= 12 or not 2000 <= year <= 2100:
+        return None
+    return year, month
+
 @attendance_bp.route('/stats', methods=['GET'])
 @jwt_required()
 def get_attendance_stats():
     """إحصائيات الحضور"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         employee_id = request.args.get('employee_id', type=int) or current_user.employee_id
-        month = request.args.get('month', type=int) or datetime.now().month
-        year = request.args.get('year', type=int) or datetime.now().year
+        period = stats_period(request.args)
+        if period is None:
+            return jsonify({
+                'success': False,
+                'message': 'الشهر يجب أن يكون بين 1 و 12 والسنة بين 2000 و 2100'
+            }), 400
+        year, month = period
         
         # الصلاحيات
         if employee_id != current_user.employee_id and current_user.role not in ['admin', 'hr']:
@@ -182,26 +331,17 @@ def get_attendance_stats():
                 'message': 'ليس لديك صلاحية'
             }), 403
         
-        stats = db.session.query(
-            db.func.count(Attendance.id).label('total_days'),
-            db.func.sum(db.case((Attendance.status == 'present', 1), else_=0)).label('present_days'),
-            db.func.sum(db.case((Attendance.status == 'absent', 1), else_=0)).label('absent_days'),
-            db.func.sum(Attendance.work_hours).label('total_hours'),
-            db.func.avg(Attendance.work_hours).label('avg_hours')
-        ).filter(
-            Attendance.employee_id == employee_id,
-            db.extract('month', Attendance.date) == month,
-            db.extract('year', Attendance.date) == year
-        ).first()
+        stats = employee_month_stats(employee_id, year, month)
         
         return jsonify({
             'success': True,
             'data': {
-                'total_days': stats.total_days or 0,
-                'present_days': stats.present_days or 0,
-                'absent_days': stats.absent_days or 0,
-                'total_hours': float(stats.total_hours) if stats.total_hours else 0,
-                'avg_hours': float(stats.avg_hours) if stats.avg_hours else 0
+                'total_days': stats['total_days'] or 0,
+                'present_days': stats['present_days'] or 0,
+                'absent_days': stats['absent_days'] or 0,
+                'late_days': stats['late_days'] or 0,
+                'total_hours': float(stats['total_hours'] or 0),
+                'avg_hours': float(stats['avg_hours'] or 0)
             }
         }), 200
         
@@ -212,4 +352,144 @@ def get_attendance_stats():
         }), 500
 
 
+@attendance_bp.route('/stats/departments', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr')
+def get_department_attendance_stats():
+    """إحصائيات الحضور لكل إدارة لشهر محدد"""
+    try:
+        period = stats_period(request.args)
+        if period is None:
+            return jsonify({
+                'success': False,
+                'message': 'الشهر يجب أن يكون بين 1 و 12 والسنة بين 2000 و 2100'
+            }), 400
+        year, month = period
+        
+        return jsonify({
+            'success': True,
+            'data': department_month_stats(year, month)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@attendance_bp.route('/presence', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr')
+def get_presence():
+    """الحاضرون والغائبون والمتأخرون ليوم (اليوم افتراضياً)"""
+    try:
+        day = request.args.get('date')
+        day = datetime.strptime(day, '%Y-%m-%d').date() if day else date.today()
+        department_id = request.args.get('department_id', type=int)
+        include_ids = request.args.get('include_ids', 'false').lower() in ('1', 'true')
+        
+        return jsonify({
+            'success': True,
+            'data': presence.day_presence(day, department_id, include_ids)
+        }), 200
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@attendance_bp.route('/presence/range', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr')
+def get_presence_range():
+    """أعداد الحضور لكل يوم في نطاق تاريخ"""
+    try:
+        try:
+            start = datetime.strptime(request.args.get('start_date', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.args.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'الحقلان start_date و end_date مطلوبان (YYYY-MM-DD)'
+            }), 400
+        
+        if end < start or (end - start).days >= presence.MAX_RANGE_DAYS:
+            return jsonify({
+                'success': False,
+                'message': f'نطاق التاريخ غير صالح (حتى {presence.MAX_RANGE_DAYS} يوم)'
+            }), 400
+        
+        department_id = request.args.get('department_id', type=int)
+        
+        return jsonify({
+            'success': True,
+            'data': presence.range_presence(start, end, department_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@attendance_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr')
+def get_attendance_analytics():
+    """مؤشرات التأخير والعمل الإضافي والغياب (معامل برادفورد) لفترة"""
+    try:
+        today = date.today()
+        try:
+            start = request.args.get('start_date')
+            end = request.args.get('end_date')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else today.replace(day=1)
+            end = datetime.strptime(end, '%Y-%m-%d').date() if end else today
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'صيغة التاريخ غير صحيحة (YYYY-MM-DD)'
+            }), 400
+        
+        if end < start or (end - start).days >= attendance_analytics.MAX_PERIOD_DAYS:
+            return jsonify({
+                'success': False,
+                'message': f'الفترة غير صالحة (حتى {attendance_analytics.MAX_PERIOD_DAYS} يوم)'
+            }), 400
+        
+        sort = request.args.get('sort', 'bradford_factor')
+        if sort not in attendance_analytics.SORT_FIELDS:
+            return jsonify({
+                'success': False,
+                'message': f"حقل الترتيب غير مدعوم: {', '.join(attendance_analytics.SORT_FIELDS)}"
+            }), 400
+        
+        report = attendance_analytics.period_report(
+            start,
+            end,
+            department_id=request.args.get('department_id', type=int),
+            sort=sort,
+            limit=max(0, min(request.args.get('limit', 50, type=int), 1000))
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': report
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
 
@@ -2,15 +2,27 @@
 مسارات المصادقة والتفويض
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
 
 from config.database import db
 from models.user import User
 from models.employee import Employee
+from services.password_hasher import PasswordHasherBusy
+from utils.auth import roles_required, revoke_token
 
 auth_bp = Blueprint('auth', __name__)
 
+def hasher_busy_response(error):
+    """503 مع Retry-After عندما يكون مجمع تشفير كلمات المرور ممتلئاً"""
+    db.session.rollback()
+    response = jsonify({
+        'success': False,
+        'message': str(error)
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """تسجيل الدخول"""
@@ -38,8 +50,8 @@ def login():
         user.last_login = datetime.utcnow()
         db.session.commit()
         
-        # إنشاء Token
-        access_token = create_access_token(identity=user.id)
+        # إنشاء Token (sub نصي كما يشترط PyJWT ≥ 2.10)
+        access_token = create_access_token(identity=str(user.id))
         
         # جلب بيانات الموظف إن وجدت
         user_data = user.to_dict()
@@ -58,6 +70,8 @@ def login():
             }
         }), 200
         
+    except PasswordHasherBusy as e:
+        return hasher_busy_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -70,7 +84,7 @@ def login():
 def get_me():
     """الحصول على بيانات المستخدم الحالي"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         user = User.query.get(current_user_id)
         
         if not user:
@@ -112,19 +126,10 @@ def get_me():
 
 @auth_bp.route('/register', methods=['POST'])
 @jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لإضافة مستخدمين')
 def register():
     """تسجيل مستخدم جديد (للإداريين فقط)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        # التحقق من الصلاحيات
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية لإضافة مستخدمين'
-            }), 403
-        
         data = request.get_json()
         email = data.get('email')
         password = data.get('password')
@@ -162,6 +167,8 @@ def register():
             'data': new_user.to_dict()
         }), 201
         
+    except PasswordHasherBusy as e:
+        return hasher_busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -173,11 +180,21 @@ def register():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """تسجيل الخروج"""
-    return jsonify({
-        'success': True,
-        'message': 'تم تسجيل الخروج بنجاح'
-    }), 200
+    """تسجيل الخروج (إلغاء التوكن الحالي)"""
+    try:
+        revoke_token(get_jwt())
+        
+        return jsonify({
+            'success': True,
+            'message': 'تم تسجيل الخروج بنجاح'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
 
 
 
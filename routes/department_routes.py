@@ -2,12 +2,16 @@
 مسارات إدارة الأقسام
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from config.database import db
-from models.user import User
 from models.department import Department
 from models.employee import Employee
+from services import hierarchy
+from utils.cache import stats_cache
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import version_validators
+from utils.auth import roles_required
 
 department_bp = Blueprint('departments', __name__)
 
@@ -16,11 +20,51 @@ department_bp = Blueprint('departments', __name__)
 def get_departments():
     """الحصول على قائمة الإدارات"""
     try:
-        departments = Department.query.filter_by(is_active=True).order_by(Department.name).all()
+        fields = parse_fields(Department, request.args.get('fields'))
+        if fields:
+            load_options = [load_only_option(Department, fields, extra=('name',))]
+        else:
+            load_options = Department.eager_options()
+        
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = version_validators(stats_cache)
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        departments = Department.query.options(*load_options).filter_by(
+            is_active=True
+        ).order_by(Department.name).all()
+        
+        return validators.apply(jsonify({
+            'success': True,
+            'data': [
+                serialize(dept, fields) if fields else dept.to_dict(include_relations=True)
+                for dept in departments
+            ]
+        })), 200
+        
+    except InvalidFields as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@department_bp.route('/tree', methods=['GET'])
+@jwt_required()
+def get_department_tree():
+    """شجرة الإدارات مع العدد والرواتب المجمعة (استعلام واحد)"""
+    try:
+        root_id = request.args.get('root', type=int)
         
         return jsonify({
             'success': True,
-            'data': [dept.to_dict(include_relations=True) for dept in departments]
+            'data': hierarchy.department_tree(root_id=root_id)
         }), 200
         
     except Exception as e:
@@ -35,7 +79,18 @@ def get_departments():
 def get_department(id):
     """الحصول على إدارة واحدة"""
     try:
-        department = Department.query.get(id)
+        fields = parse_fields(Department, request.args.get('fields'))
+        if fields:
+            load_options = [load_only_option(Department, fields, extra=('is_active',))]
+        else:
+            load_options = Department.eager_options()
+        
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = version_validators(stats_cache, id)
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        department = db.session.get(Department, id, options=load_options)
         
         if not department or not department.is_active:
             return jsonify({
@@ -43,10 +98,13 @@ def get_department(id):
                 'message': 'الإدارة غير موجودة'
             }), 404
         
-        dept_data = department.to_dict(include_relations=True)
+        dept_data = serialize(department, fields) if fields else department.to_dict(include_relations=True)
         
-        # جلب الموظفين
-        employees = Employee.query.filter_by(
+        # جلب الموظفين (الأعمدة المعروضة فقط)
+        employees = Employee.query.options(db.load_only(
+            Employee.id, Employee.employee_number, Employee.first_name,
+            Employee.last_name, Employee.email, Employee.phone
+        )).filter_by(
             department_id=id,
             status='active'
         ).order_by(Employee.first_name).all()
@@ -61,11 +119,16 @@ def get_department(id):
             } for emp in employees
         ]
         
-        return jsonify({
+        return validators.apply(jsonify({
             'success': True,
             'data': dept_data
-        }), 200
+        })), 200
         
+    except InvalidFields as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -75,18 +138,10 @@ def get_department(id):
 
 @department_bp.route('/', methods=['POST'])
 @jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لإضافة إدارات')
 def create_department():
     """إضافة إدارة جديدة"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية لإضافة إدارات'
-            }), 403
-        
         data = request.get_json()
         
         if not data.get('name'):
@@ -131,18 +186,10 @@ def create_department():
 
 @department_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لتعديل الإدارات')
 def update_department(id):
     """تحديث إدارة"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية لتعديل الإدارات'
-            }), 403
-        
         department = Department.query.get(id)
         
         if not department:
@@ -176,18 +223,10 @@ def update_department(id):
 
 @department_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
+@roles_required('admin', message='ليس لديك صلاحية لحذف الإدارات')
 def delete_department(id):
     """حذف إدارة"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role != 'admin':
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية لحذف الإدارات'
-            }), 403
-        
         department = Department.query.get(id)
         
         if not department:
@@ -219,31 +258,55 @@ def delete_department(id):
         }), 500
 
 
-@department_bp.route('/stats/overview', methods=['GET'])
+@department_bp.route('/reconcile-counts', methods=['POST'])
 @jwt_required()
-def get_department_stats():
-    """إحصائيات الإدارات"""
+@roles_required('admin')
+def reconcile_employee_counts():
+    """مطابقة عدد موظفي الإدارات مع العدد الفعلي (عند الطلب)"""
     try:
-        stats = db.session.query(
-            Department.id,
-            Department.name,
-            Department.employee_count,
-            Department.budget,
-            db.func.count(db.distinct(Employee.job_title_id)).label('job_positions'),
-            db.func.avg(Employee.salary).label('avg_salary')
-        ).outerjoin(Employee, db.and_(
-            Department.id == Employee.department_id,
-            Employee.status == 'active'
-        )).filter(Department.is_active == True).group_by(
-            Department.id,
-            Department.name,
-            Department.employee_count,
-            Department.budget
-        ).order_by(Department.employee_count.desc()).all()
+        fixed = Department.recount_employees()
+        if fixed:
+            stats_cache.invalidate()
+        db.session.commit()
         
         return jsonify({
             'success': True,
-            'data': [
+            'message': f'تم تصحيح عدد الموظفين في {fixed} إدارة',
+            'data': {'fixed_departments': fixed}
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@department_bp.route('/stats/overview', methods=['GET'])
+@jwt_required()
+def get_department_stats():
+    """إحصائيات الإدارات"""
+    try:
+        def compute():
+            stats = db.session.query(
+                Department.id,
+                Department.name,
+                Department.employee_count,
+                Department.budget,
+                db.func.count(db.distinct(Employee.job_title_id)).label('job_positions'),
+                db.func.avg(Employee.salary).label('avg_salary')
+            ).outerjoin(Employee, db.and_(
+                Department.id == Employee.department_id,
+                Employee.status == 'active'
+            )).filter(Department.is_active == True).group_by(
+                Department.id,
+                Department.name,
+                Department.employee_count,
+                Department.budget
+            ).order_by(Department.employee_count.desc()).all()
+            
+            return [
                 {
                     'id': s.id,
                     'name': s.name,
@@ -253,6 +316,11 @@ def get_department_stats():
                     'avg_salary': float(s.avg_salary) if s.avg_salary else 0
                 } for s in stats
             ]
+        
+        # مخزنة مؤقتاً وتُبطل عند أي كتابة على الموظفين أو الإدارات
+        return jsonify({
+            'success': True,
+            'data': stats_cache.get_or_compute('department_overview', compute)
         }), 200
         
     except Exception as e:
@@ -1,15 +1,22 @@
 """
 مسارات إدارة الموظفين
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required
 from datetime import datetime
 import random
 
 from config.database import db
-from models.user import User
 from models.employee import Employee
 from models.department import Department
+from models.job_title import JobTitle
+from services import employee_search, employee_import, hierarchy
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import version_validators
+from utils.pagination import keyset_paginate, cached_count, InvalidCursor
+from utils.cache import stats_cache
+from utils.streaming import csv_lines, ndjson_lines
+from utils.auth import roles_required
 
 employee_bp = Blueprint('employees', __name__)
 
@@ -19,6 +26,29 @@ def generate_employee_number():
     random_num = random.randint(100, 999)
     return f"EMP{timestamp}{random_num}"
 
+def apply_employee_filters(query, args):
+    """
+    تطبيق فلاتر قائمة الموظفين (department, status, search) على استعلام أو select
+
+    يعيد (الاستعلام، عمود الصلة عند البحث أو None)
+    """
+    department_id = args.get('department')
+    status = args.get('status', 'active')
+    search = args.get('search')
+    
+    if department_id:
+        query = query.filter(Employee.department_id == department_id)
+    
+    if status:
+        query = query.filter(Employee.status == status)
+    
+    # البحث عبر الفهرس النصي (FTS5 / tsvector) مع توحيد النص العربي
+    rank = None
+    if search:
+        query, rank = employee_search.apply_search(query, search)
+    
+    return query, rank
+
 @employee_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_employees():
@@ -26,39 +56,75 @@ def get_employees():
     try:
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
-        department_id = request.args.get('department')
-        status = request.args.get('status', 'active')
-        search = request.args.get('search')
-        
-        # بناء الاستعلام
-        query = Employee.query
+        cursor = request.args.get('cursor')
         
-        if department_id:
-            query = query.filter_by(department_id=department_id)
+        # الحقول الجزئية: تحميل الأعمدة المطلوبة فقط، وإلا تحميل العلاقات مسبقاً
+        fields = parse_fields(Employee, request.args.get('fields'))
+        if fields:
+            load_options = [load_only_option(Employee, fields, extra=('created_at',))]
+        else:
+            load_options = Employee.eager_options()
         
-        if status:
-            query = query.filter_by(status=status)
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = version_validators(stats_cache)
+        if validators.is_fresh():
+            return validators.not_modified()
         
-        if search:
-            query = query.filter(
-                db.or_(
-                    Employee.first_name.like(f'%{search}%'),
-                    Employee.last_name.like(f'%{search}%'),
-                    Employee.email.like(f'%{search}%'),
-                    Employee.employee_number.like(f'%{search}%')
-                )
+        # بناء الاستعلام
+        query, rank = apply_employee_filters(Employee.query, request.args)
+        
+        # وضع المؤشر (Keyset): ?cursor= للصفحة الأولى ثم قيمة next_cursor
+        if cursor is not None:
+            limit = max(1, min(limit, 200))
+            employees, next_cursor = keyset_paginate(
+                query.options(*load_options),
+                [Employee.created_at, Employee.id],
+                cursor=cursor,
+                limit=limit
             )
+            
+            pagination = {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+            
+            # العدد الإجمالي اختياري وتقريبي (مخزن مؤقتاً)
+            if request.args.get('include_total', '').lower() in ('1', 'true'):
+                cache_key = ('employees',) + tuple(
+                    request.args.get(name) for name in ('department', 'status', 'search')
+                )
+                pagination['total'] = cached_count(cache_key, query)
+                pagination['total_is_estimate'] = True
+            
+            return validators.apply(jsonify({
+                'success': True,
+                'data': {
+                    'employees': [
+                        serialize(emp, fields) if fields else emp.to_dict(include_relations=True)
+                        for emp in employees
+                    ],
+                    'pagination': pagination
+                }
+            })), 200
         
         # تطبيق Pagination
         total = query.count()
-        employees = query.order_by(Employee.created_at.desc()).paginate(
-            page=page, per_page=limit, error_out=False
+        order = [Employee.created_at.desc(), Employee.id.desc()]
+        if rank is not None:
+            order.insert(0, rank)
+        
+        employees = query.options(*load_options).order_by(*order).paginate(
+            page=page, per_page=limit, error_out=False, count=False
         )
         
-        return jsonify({
+        return validators.apply(jsonify({
             'success': True,
             'data': {
-                'employees': [emp.to_dict(include_relations=True) for emp in employees.items],
+                'employees': [
+                    serialize(emp, fields) if fields else emp.to_dict(include_relations=True)
+                    for emp in employees.items
+                ],
                 'pagination': {
                     'page': page,
                     'limit': limit,
@@ -66,7 +132,77 @@ def get_employees():
                     'pages': (total + limit - 1) // limit
                 }
             }
-        }), 200
+        })), 200
+        
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+EXPORT_COLUMNS = (
+    'id', 'employee_number', 'first_name', 'last_name', 'email', 'phone',
+    'date_of_birth', 'gender', 'national_id', 'marital_status', 'address', 'city',
+    'country', 'department_id', 'job_title_id', 'manager_id', 'hire_date',
+    'employment_type', 'work_location', 'salary', 'status', 'created_at'
+)
+
+@employee_bp.route('/export', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لتصدير بيانات الموظفين')
+def export_employees():
+    """تصدير الموظفين كملف CSV أو NDJSON متدفق (نفس فلاتر القائمة)"""
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({
+                'success': False,
+                'message': 'صيغة الملف غير مدعومة (csv أو ndjson)'
+            }), 400
+        
+        # إسقاط الأعمدة المطلوبة فقط بدلاً من كائنات Employee كاملة
+        statement = db.select(
+            *[getattr(Employee, name) for name in EXPORT_COLUMNS],
+            Department.name.label('department_name'),
+            JobTitle.title.label('job_title_name')
+        ).outerjoin(
+            Department, Department.id == Employee.department_id
+        ).outerjoin(
+            JobTitle, JobTitle.id == Employee.job_title_id
+        )
+        statement, _ = apply_employee_filters(statement, request.args)
+        statement = statement.order_by(Employee.id)
+        
+        header = list(EXPORT_COLUMNS) + ['department_name', 'job_title_name']
+        
+        def batches():
+            # مؤشر من جهة الخادم: الذاكرة ثابتة مهما كان عدد الموظفين
+            result = db.session.execute(statement, execution_options={'yield_per': 1000})
+            for partition in result.partitions():
+                if fmt == 'csv':
+                    yield partition
+                else:
+                    yield [dict(zip(header, row)) for row in partition]
+        
+        if fmt == 'csv':
+            body = csv_lines(header, batches())
+            mimetype = 'text/csv'
+        else:
+            body = ndjson_lines(batches())
+            mimetype = 'application/x-ndjson'
+        
+        filename = f"employees-{datetime.now().strftime('%Y%m%d')}.{fmt}"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
         
     except Exception as e:
         return jsonify({
@@ -80,7 +216,18 @@ def get_employees():
 def get_employee(id):
     """الحصول على موظف واحد"""
     try:
-        employee = Employee.query.get(id)
+        fields = parse_fields(Employee, request.args.get('fields'))
+        if fields:
+            load_options = [load_only_option(Employee, fields)]
+        else:
+            load_options = Employee.eager_options()
+        
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = version_validators(stats_cache, id)
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        employee = db.session.get(Employee, id, options=load_options)
         
         if not employee:
             return jsonify({
@@ -88,9 +235,43 @@ def get_employee(id):
                 'message': 'الموظف غير موجود'
             }), 404
         
+        return validators.apply(jsonify({
+            'success': True,
+            'data': serialize(employee, fields) if fields else employee.to_dict(include_relations=True)
+        })), 200
+        
+    except InvalidFields as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@employee_bp.route('/<int:id>/subordinates', methods=['GET'])
+@jwt_required()
+def get_reporting_tree(id):
+    """الهيكل الإداري تحت موظف (استعلام واحد)"""
+    try:
+        depth = request.args.get('depth', hierarchy.MAX_DEPTH, type=int)
+        depth = max(1, min(depth, hierarchy.MAX_DEPTH))
+        active_only = request.args.get('include_inactive', '').lower() not in ('1', 'true')
+        
+        tree = hierarchy.reporting_subtree(id, max_depth=depth, active_only=active_only)
+        
+        if tree is None:
+            return jsonify({
+                'success': False,
+                'message': 'الموظف غير موجود'
+            }), 404
+        
         return jsonify({
             'success': True,
-            'data': employee.to_dict(include_relations=True)
+            'data': tree
         }), 200
         
     except Exception as e:
@@ -100,21 +281,37 @@ def get_employee(id):
         }), 500
 
 
-@employee_bp.route('/', methods=['POST'])
+@employee_bp.route('/<int:id>/management-chain', methods=['GET'])
 @jwt_required()
-def create_employee():
-    """إضافة موظف جديد"""
+def get_management_chain(id):
+    """سلسلة المدراء لموظف من المدير المباشر حتى أعلى الهرم"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        chain = hierarchy.management_chain(id)
         
-        # التحقق من الصلاحيات
-        if current_user.role not in ['admin', 'hr']:
+        if chain is None:
             return jsonify({
                 'success': False,
-                'message': 'ليس لديك صلاحية لإضافة موظفين'
-            }), 403
+                'message': 'الموظف غير موجود'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': chain
+        }), 200
         
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@employee_bp.route('/', methods=['POST'])
+@jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لإضافة موظفين')
+def create_employee():
+    """إضافة موظف جديد"""
+    try:
         data = request.get_json()
         
         # التحقق من الحقول المطلوبة
@@ -170,19 +367,10 @@ def create_employee():
             status='active'
         )
         
+        # عدد موظفي الإدارة يُحدَّث تلقائياً داخل نفس المعاملة (أحداث Employee)
         db.session.add(new_employee)
         db.session.commit()
         
-        # تحديث عدد الموظفين في الإدارة
-        if new_employee.department_id:
-            dept = Department.query.get(new_employee.department_id)
-            if dept:
-                dept.employee_count = Employee.query.filter_by(
-                    department_id=dept.id, 
-                    status='active'
-                ).count()
-                db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'تم إضافة الموظف بنجاح',
@@ -197,21 +385,61 @@ def create_employee():
         }), 500
 
 
-@employee_bp.route('/<int:id>', methods=['PUT'])
+@employee_bp.route('/import', methods=['POST'])
 @jwt_required()
-def update_employee(id):
-    """تحديث بيانات موظف"""
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لإضافة موظفين')
+def import_employees():
+    """استيراد الموظفين بالجملة من ملف CSV أو NDJSON"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        # التحقق من الصلاحيات
-        if current_user.role not in ['admin', 'hr']:
+        # الملف كحقل multipart باسم file أو كجسم الطلب مباشرة
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+            filename = (upload.filename or '').lower()
+            content_type = upload.mimetype or ''
+        else:
+            stream = request.stream
+            filename = ''
+            content_type = request.mimetype or ''
+        
+        fmt = request.args.get('format')
+        if not fmt:
+            is_ndjson = filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type
+            fmt = 'ndjson' if is_ndjson else 'csv'
+        
+        if fmt not in ('csv', 'ndjson'):
             return jsonify({
                 'success': False,
-                'message': 'ليس لديك صلاحية لتعديل بيانات الموظفين'
-            }), 403
+                'message': 'صيغة الملف غير مدعومة (csv أو ndjson)'
+            }), 400
         
+        default_chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+        chunk_size = request.args.get('chunk_size', default_chunk_size, type=int)
+        chunk_size = max(1, min(chunk_size, 10000))
+        
+        report = employee_import.import_employees(stream, fmt=fmt, chunk_size=chunk_size)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f"تم استيراد {report['imported']} موظف",
+            'data': report
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@employee_bp.route('/<int:id>', methods=['PUT'])
+@jwt_required()
+@roles_required('admin', 'hr', message='ليس لديك صلاحية لتعديل بيانات الموظفين')
+def update_employee(id):
+    """تحديث بيانات موظف"""
+    try:
         employee = Employee.query.get(id)
         
         if not employee:
@@ -221,7 +449,6 @@ def update_employee(id):
             }), 404
         
         data = request.get_json()
-        old_department_id = employee.department_id
         
         # تحديث البيانات
         for key, value in data.items():
@@ -234,18 +461,6 @@ def update_employee(id):
         employee.updated_at = datetime.utcnow()
         db.session.commit()
         
-        # تحديث عدد الموظفين في الإدارات
-        if old_department_id != employee.department_id:
-            for dept_id in [old_department_id, employee.department_id]:
-                if dept_id:
-                    dept = Department.query.get(dept_id)
-                    if dept:
-                        dept.employee_count = Employee.query.filter_by(
-                            department_id=dept.id,
-                            status='active'
-                        ).count()
-            db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'تم تحديث البيانات بنجاح',
@@ -262,19 +477,10 @@ def update_employee(id):
 
 @employee_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
+@roles_required('admin', message='ليس لديك صلاحية لحذف الموظفين')
 def delete_employee(id):
     """حذف موظف (تعطيل)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        # التحقق من الصلاحيات
-        if current_user.role != 'admin':
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية لحذف الموظفين'
-            }), 403
-        
         employee = Employee.query.get(id)
         
         if not employee:
@@ -288,16 +494,6 @@ def delete_employee(id):
         employee.updated_at = datetime.utcnow()
         db.session.commit()
         
-        # تحديث عدد الموظفين في الإدارة
-        if employee.department_id:
-            dept = Department.query.get(employee.department_id)
-            if dept:
-                dept.employee_count = Employee.query.filter_by(
-                    department_id=dept.id,
-                    status='active'
-                ).count()
-                db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'تم تعطيل الموظف بنجاح'
@@ -316,31 +512,35 @@ def delete_employee(id):
 def get_employee_stats():
     """الحصول على إحصائيات الموظفين"""
     try:
-        # إجمالي الموظفين
-        total_employees = Employee.query.filter_by(status='active').count()
-        
-        # توزيع حسب الإدارات
-        department_stats = db.session.query(
-            Department.name,
-            db.func.count(Employee.id).label('count')
-        ).outerjoin(Employee, db.and_(
-            Department.id == Employee.department_id,
-            Employee.status == 'active'
-        )).group_by(Department.id, Department.name).all()
-        
-        # توزيع حسب الجنس
-        gender_stats = db.session.query(
-            Employee.gender,
-            db.func.count(Employee.id).label('count')
-        ).filter(Employee.status == 'active').group_by(Employee.gender).all()
-        
-        return jsonify({
-            'success': True,
-            'data': {
+        def compute():
+            # إجمالي الموظفين
+            total_employees = Employee.query.filter_by(status='active').count()
+            
+            # توزيع حسب الإدارات
+            department_stats = db.session.query(
+                Department.name,
+                db.func.count(Employee.id).label('count')
+            ).outerjoin(Employee, db.and_(
+                Department.id == Employee.department_id,
+                Employee.status == 'active'
+            )).group_by(Department.id, Department.name).all()
+            
+            # توزيع حسب الجنس
+            gender_stats = db.session.query(
+                Employee.gender,
+                db.func.count(Employee.id).label('count')
+            ).filter(Employee.status == 'active').group_by(Employee.gender).all()
+            
+            return {
                 'totalEmployees': total_employees,
                 'departmentStats': [{'name': name, 'count': count} for name, count in department_stats],
                 'genderStats': [{'gender': gender, 'count': count} for gender, count in gender_stats]
             }
+        
+        # مخزنة مؤقتاً وتُبطل عند أي كتابة على الموظفين أو الإدارات
+        return jsonify({
+            'success': True,
+            'data': stats_cache.get_or_compute('employee_overview', compute)
         }), 200
         
     except Exception as e:
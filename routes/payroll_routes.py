@@ -1,22 +1,42 @@
 """
 مسارات إدارة الرواتب
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_current_user
+from datetime import datetime
 
 from config.database import db
-from models.user import User
-from models.payroll import Payroll
+from models.payroll import Payroll, PayrollRun
+from models.bank_account import EmployeeBankAccount
+from models.employee import Employee
+from services.payroll_engine import generate_payroll, PayrollRunError
+from services.payroll_rollup import budget_utilization
+from services import payroll_export
+from utils.auth import roles_required
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import page_validators
+from utils.pagination import keyset_paginate, InvalidCursor
+from utils.sql import dialect_insert
+from utils.streaming import csv_lines
 
 payroll_bp = Blueprint('payroll', __name__)
 
+PAYROLL_STATUSES = ('pending', 'paid', 'cancelled')
+
+def payroll_related(record):
+    """الصفوف المرتبطة الظاهرة في to_dict(include_relations=True)"""
+    employee = record.employee
+    return (employee, employee.department if employee else None)
+
 @payroll_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_payroll_records():
-    """الحصول على سجلات الرواتب"""
+    """الحصول على سجلات الرواتب (صفحات بالمؤشر على year, month, id)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
+        
+        limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+        cursor = request.args.get('cursor')
         
         query = Payroll.query
         
@@ -24,14 +44,360 @@ def get_payroll_records():
         if current_user.role not in ['admin', 'hr', 'finance']:
             query = query.filter_by(employee_id=current_user.employee_id)
         
-        records = query.order_by(Payroll.year.desc(), Payroll.month.desc()).all()
+        # الفلاتر
+        year = request.args.get('year', type=int)
+        month = request.args.get('month', type=int)
+        department_id = request.args.get('department_id', type=int)
+        status = request.args.get('status')
+        
+        if status and status not in PAYROLL_STATUSES:
+            return jsonify({
+                'success': False,
+                'message': f'الحالة يجب أن تكون إحدى: {", ".join(PAYROLL_STATUSES)}'
+            }), 400
+        
+        if year:
+            query = query.filter(Payroll.year == year)
+        if month:
+            query = query.filter(Payroll.month == month)
+        if status:
+            query = query.filter(Payroll.status == status)
+        if department_id:
+            query = query.join(Employee, Employee.id == Payroll.employee_id).filter(
+                Employee.department_id == department_id
+            )
+        
+        fields = parse_fields(Payroll, request.args.get('fields'))
+        
+        if fields:
+            query = query.options(load_only_option(Payroll, fields, extra=('year', 'month', 'updated_at')))
+        else:
+            query = query.options(*Payroll.eager_options())
+        
+        records, next_cursor = keyset_paginate(
+            query, [Payroll.year, Payroll.month, Payroll.id], cursor=cursor, limit=limit
+        )
+        
+        # طلب شرطي: 304 إذا لم تتغير الصفحة (وموظفوها وإداراتهم) منذ آخر نسخة لدى العميل
+        validators = page_validators(
+            records, next_cursor, related=None if fields else payroll_related
+        )
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        return validators.apply(jsonify({
+            'success': True,
+            'data': [
+                serialize(record, fields) if fields else record.to_dict(include_relations=True)
+                for record in records
+            ],
+            'pagination': {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        })), 200
+        
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@payroll_bp.route('/runs', methods=['POST'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance', message='ليس لديك صلاحية لتوليد الرواتب')
+def create_payroll_run():
+    """توليد رواتب شهر لكل الموظفين النشطين (آمن عند الإعادة)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            year = int(data['year'])
+            month = int(data['month'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': 'الحقلان year و month مطلوبان (أرقام صحيحة)'
+            }), 400
+        
+        run = generate_payroll(year, month, created_by=get_current_user().id)
+        result = run.to_dict()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'تم توليد {result["created_count"]} راتب',
+            'data': result
+        }), 201
+        
+    except PayrollRunError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@payroll_bp.route('/runs', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance')
+def get_payroll_runs():
+    """سجل عمليات توليد الرواتب (الأحدث أولاً)"""
+    try:
+        runs = PayrollRun.query.order_by(PayrollRun.id.desc()).limit(100).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [run.to_dict() for run in runs]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@payroll_bp.route('/runs/<int:run_id>', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance')
+def get_payroll_run(run_id):
+    """حالة عملية توليد رواتب وتقدمها (تُحدَّث بعد كل دفعة أثناء التنفيذ)"""
+    try:
+        run = db.session.get(PayrollRun, run_id)
+        
+        if not run:
+            return jsonify({
+                'success': False,
+                'message': 'عملية التوليد غير موجودة'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': run.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+MAX_TREND_MONTHS = 120
+
+def _parse_period(value):
+    """YYYY-MM إلى (year, month)"""
+    moment = datetime.strptime(value, '%Y-%m')
+    return moment.year, moment.month
+
+@payroll_bp.route('/budget-utilization', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance')
+def get_budget_utilization():
+    """ميزانية الإدارات مقابل صافي الرواتب لكل شهر (آخر 12 شهراً افتراضياً)"""
+    try:
+        now = datetime.now()
+        try:
+            end = _parse_period(request.args['to']) if request.args.get('to') else (now.year, now.month)
+            if request.args.get('from'):
+                start = _parse_period(request.args['from'])
+            else:
+                index = end[0] * 12 + end[1] - 12
+                start = (index // 12, index % 12 + 1)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'صيغة الفترة غير صحيحة (YYYY-MM)'
+            }), 400
+        
+        months = (end[0] - start[0]) * 12 + end[1] - start[1] + 1
+        if months < 1 or months > MAX_TREND_MONTHS:
+            return jsonify({
+                'success': False,
+                'message': f'الفترة يجب أن تكون بين شهر و {MAX_TREND_MONTHS} شهراً'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'from': f'{start[0]}-{start[1]:02d}',
+                'to': f'{end[0]}-{end[1]:02d}',
+                'departments': budget_utilization(
+                    start, end, request.args.get('department_id', type=int)
+                )
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+def _required_period(args):
+    """(year, month) من معاملات الطلب، أو None إذا كانت ناقصة أو غير صالحة"""
+    year = args.get('year', type=int)
+    month = args.get('month', type=int)
+    if not year or not month or not 1 <= month <= 12:
+        return None
+    return year, month
+
+@payroll_bp.route('/bank-file', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance')
+def export_bank_file():
+    """ملف التحويل البنكي لرواتب شهر (CSV أو بعرض ثابت) متدفق"""
+    try:
+        period = _required_period(request.args)
+        if period is None:
+            return jsonify({
+                'success': False,
+                'message': 'الحقلان year و month مطلوبان'
+            }), 400
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'fixed'):
+            return jsonify({
+                'success': False,
+                'message': 'صيغة الملف غير مدعومة (csv أو fixed)'
+            }), 400
+        
+        year, month = period
+        
+        # لا يُصدر ملف دفع ناقص: الموظفون بدون حساب بنكي يجب استكمالهم أولاً
+        missing, employee_numbers = payroll_export.missing_bank_accounts(year, month)
+        if missing:
+            return jsonify({
+                'success': False,
+                'message': f'{missing} موظف بدون حساب بنكي',
+                'data': {
+                    'missing_count': missing,
+                    'employee_numbers': employee_numbers
+                }
+            }), 409
+        
+        currency = current_app.config.get('PAYROLL_CURRENCY', 'SAR')
+        statement = payroll_export.payroll_statement(year, month).where(Payroll.net_salary > 0)
+        batches = payroll_export.payroll_batches(statement)
+        
+        if fmt == 'csv':
+            body = csv_lines(
+                payroll_export.BANK_FILE_HEADER,
+                payroll_export.bank_csv_batches(batches, year, month, currency),
+                # أنظمة استيراد البنوك ليست Excel، و BOM يفسد اسم أول عمود
+                bom=False
+            )
+            mimetype, extension = 'text/csv', 'csv'
+        else:
+            body = payroll_export.bank_fixed_width_lines(batches, year, month, currency)
+            mimetype, extension = 'text/plain', 'txt'
+        
+        filename = f'bank-transfer-{year}-{month:02d}.{extension}'
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@payroll_bp.route('/payslips', methods=['GET'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance')
+def export_payslips():
+    """ملف ZIP متدفق بقسيمة راتب لكل موظف في الشهر"""
+    try:
+        period = _required_period(request.args)
+        if period is None:
+            return jsonify({
+                'success': False,
+                'message': 'الحقلان year و month مطلوبان'
+            }), 400
+        
+        year, month = period
+        statement = payroll_export.payroll_statement(
+            year, month, request.args.get('department_id', type=int)
+        )
+        body = payroll_export.payslip_zip(
+            payroll_export.payroll_batches(statement, size=500),
+            workers=current_app.config.get('PAYSLIP_RENDER_WORKERS', 1)
+        )
+        
+        filename = f'payslips-{year}-{month:02d}.zip'
+        return Response(
+            stream_with_context(body),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
+
+
+@payroll_bp.route('/bank-accounts/<int:employee_id>', methods=['PUT'])
+@jwt_required()
+@roles_required('admin', 'hr', 'finance', message='ليس لديك صلاحية لتعديل الحسابات البنكية')
+def set_bank_account(employee_id):
+    """إضافة أو تحديث الحساب البنكي للموظف"""
+    try:
+        if db.session.get(Employee, employee_id) is None:
+            return jsonify({
+                'success': False,
+                'message': 'الموظف غير موجود'
+            }), 404
+        
+        data = request.get_json(silent=True) or {}
+        iban = payroll_export.normalize_iban(data.get('iban'))
+        if iban is None:
+            return jsonify({
+                'success': False,
+                'message': 'رقم IBAN غير صالح'
+            }), 400
+        
+        now = datetime.utcnow()
+        values = {
+            'iban': iban,
+            'bank_name': data.get('bank_name'),
+            'account_name': data.get('account_name'),
+            'updated_at': now
+        }
+        statement = dialect_insert(EmployeeBankAccount).values(
+            employee_id=employee_id, created_at=now, **values
+        )
+        db.session.execute(statement.on_conflict_do_update(index_elements=['employee_id'], set_=values))
+        db.session.commit()
         
         return jsonify({
             'success': True,
-            'data': [record.to_dict(include_relations=True) for record in records]
+            'message': 'تم حفظ الحساب البنكي بنجاح',
+            'data': db.session.get(EmployeeBankAccount, employee_id, populate_existing=True).to_dict()
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': f'حدث خطأ: {str(e)}'
@@ -2,21 +2,28 @@
 مسارات إدارة تقييم الأداء
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_current_user
 
 from config.database import db
-from models.user import User
 from models.performance import PerformanceReview
+from models.employee import Employee
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import page_validators
+from utils.pagination import keyset_paginate, InvalidCursor
 
 performance_bp = Blueprint('performance', __name__)
 
+REVIEW_STATUSES = ('draft', 'submitted', 'approved')
+
 @performance_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_performance_reviews():
-    """الحصول على تقييمات الأداء"""
+    """الحصول على تقييمات الأداء (صفحات بالمؤشر على review_date, id)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
+        
+        limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+        cursor = request.args.get('cursor')
         
         query = PerformanceReview.query
         
@@ -24,13 +31,67 @@ def get_performance_reviews():
         if current_user.role not in ['admin', 'hr']:
             query = query.filter_by(employee_id=current_user.employee_id)
         
-        reviews = query.order_by(PerformanceReview.review_date.desc()).all()
+        # الفلاتر
+        review_period = request.args.get('review_period')
+        status = request.args.get('status')
+        reviewer_id = request.args.get('reviewer_id', type=int)
+        department_id = request.args.get('department_id', type=int)
         
-        return jsonify({
+        if status and status not in REVIEW_STATUSES:
+            return jsonify({
+                'success': False,
+                'message': f'الحالة يجب أن تكون إحدى: {", ".join(REVIEW_STATUSES)}'
+            }), 400
+        
+        if review_period:
+            query = query.filter(PerformanceReview.review_period == review_period)
+        if status:
+            query = query.filter(PerformanceReview.status == status)
+        if reviewer_id:
+            query = query.filter(PerformanceReview.reviewer_id == reviewer_id)
+        if department_id:
+            query = query.join(Employee, Employee.id == PerformanceReview.employee_id).filter(
+                Employee.department_id == department_id
+            )
+        
+        fields = parse_fields(PerformanceReview, request.args.get('fields'))
+        
+        if fields:
+            query = query.options(load_only_option(PerformanceReview, fields, extra=('review_date', 'updated_at')))
+        else:
+            query = query.options(*PerformanceReview.eager_options())
+        
+        # التقييمات بدون تاريخ تأتي في نهاية القائمة
+        reviews, next_cursor = keyset_paginate(
+            query, [PerformanceReview.review_date, PerformanceReview.id], cursor=cursor, limit=limit,
+            nullable=[PerformanceReview.review_date]
+        )
+        
+        # طلب شرطي: 304 إذا لم تتغير الصفحة (والموظفون والمقيّمون فيها) منذ آخر نسخة لدى العميل
+        validators = page_validators(
+            reviews, next_cursor, related=None if fields else lambda review: (review.employee, review.reviewer)
+        )
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        return validators.apply(jsonify({
             'success': True,
-            'data': [review.to_dict(include_relations=True) for review in reviews]
-        }), 200
+            'data': [
+                serialize(review, fields) if fields else review.to_dict(include_relations=True)
+                for review in reviews
+            ],
+            'pagination': {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        })), 200
         
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -2,12 +2,12 @@
 مسارات التوظيف والاستقطاب
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from datetime import datetime
 
 from config.database import db
-from models.user import User
 from models.recruitment import JobPosting, JobApplication
+from utils.auth import roles_required
 
 recruitment_bp = Blueprint('recruitment', __name__)
 
@@ -59,18 +59,10 @@ def get_job_posting(id):
 
 @recruitment_bp.route('/postings', methods=['POST'])
 @jwt_required()
+@roles_required('admin', 'hr')
 def create_job_posting():
     """إضافة إعلان وظيفي جديد"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية'
-            }), 403
-        
         data = request.get_json()
         
         if not data.get('title'):
@@ -163,18 +155,10 @@ def submit_application():
 
 @recruitment_bp.route('/applications', methods=['GET'])
 @jwt_required()
+@roles_required('admin', 'hr')
 def get_applications():
     """الحصول على طلبات التوظيف"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية'
-            }), 403
-        
         status = request.args.get('status')
         job_posting_id = request.args.get('job_posting_id', type=int)
         
@@ -202,18 +186,10 @@ def get_applications():
 
 @recruitment_bp.route('/applications/<int:id>/status', methods=['PUT'])
 @jwt_required()
+@roles_required('admin', 'hr')
 def update_application_status(id):
     """تحديث حالة طلب توظيف"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية'
-            }), 403
-        
         application = JobApplication.query.get(id)
         
         if not application:
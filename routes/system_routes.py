@@ -0,0 +1,30 @@
+"""
+مسارات مراقبة النظام
+"""
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+from utils.auth import roles_required
+from utils.cache import stats_cache
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/cache', methods=['GET'])
+@jwt_required()
+@roles_required('admin')
+def get_cache_stats():
+    """عدادات إصابة/إخفاق التخزين المؤقت لهذه العملية"""
+    try:
+        data = stats_cache.stats()
+        data['generation'] = stats_cache.current_generation()
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ: {str(e)}'
+        }), 500
@@ -2,11 +2,14 @@
 مسارات إدارة التدريب
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from config.database import db
-from models.user import User
 from models.training import TrainingProgram, TrainingEnrollment
+from models.employee import Employee
+from utils.fields import parse_fields, load_only_option, serialize, InvalidFields
+from utils.http_cache import query_validators, max_updated_at
+from utils.auth import roles_required
 
 training_bp = Blueprint('training', __name__)
 
@@ -22,13 +25,28 @@ def get_training_programs():
         if status:
             query = query.filter_by(status=status)
         
+        fields = parse_fields(TrainingProgram, request.args.get('fields'))
+        
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = query_validators(query, TrainingProgram)
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        if fields:
+            query = query.options(load_only_option(TrainingProgram, fields, extra=('start_date',)))
+        
         programs = query.order_by(TrainingProgram.start_date.desc()).all()
         
-        return jsonify({
+        return validators.apply(jsonify({
             'success': True,
-            'data': [program.to_dict() for program in programs]
-        }), 200
+            'data': [serialize(program, fields) if fields else program.to_dict() for program in programs]
+        })), 200
         
+    except InvalidFields as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -41,7 +59,26 @@ def get_training_programs():
 def get_training_program(id):
     """الحصول على برنامج تدريبي واحد"""
     try:
-        program = TrainingProgram.query.get(id)
+        fields = parse_fields(TrainingProgram, request.args.get('fields'))
+        load_options = [load_only_option(TrainingProgram, fields)] if fields else []
+        
+        # طلب شرطي: 304 إذا لم تتغير البيانات منذ آخر نسخة لدى العميل
+        validators = query_validators(
+            TrainingProgram.query.filter_by(id=id),
+            TrainingProgram,
+            max_updated_at(TrainingEnrollment, TrainingEnrollment.training_program_id == id),
+            db.select(db.func.count(TrainingEnrollment.id)).where(
+                TrainingEnrollment.training_program_id == id
+            ).scalar_subquery(),
+            # أسماء المسجلين فقط (وليس جدول الموظفين كاملاً)
+            max_updated_at(Employee, Employee.id.in_(
+                db.select(TrainingEnrollment.employee_id).where(TrainingEnrollment.training_program_id == id)
+            ))
+        )
+        if validators.is_fresh():
+            return validators.not_modified()
+        
+        program = db.session.get(TrainingProgram, id, options=load_options)
         
         if not program:
             return jsonify({
@@ -49,17 +86,22 @@ def get_training_program(id):
                 'message': 'البرنامج التدريبي غير موجود'
             }), 404
         
-        program_data = program.to_dict()
+        program_data = serialize(program, fields) if fields else program.to_dict()
         
         # جلب المسجلين
         enrollments = TrainingEnrollment.query.filter_by(training_program_id=id).all()
         program_data['enrollments'] = [enroll.to_dict(include_relations=True) for enroll in enrollments]
         
-        return jsonify({
+        return validators.apply(jsonify({
             'success': True,
             'data': program_data
-        }), 200
+        })), 200
         
+    except InvalidFields as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -69,18 +111,10 @@ def get_training_program(id):
 
 @training_bp.route('/', methods=['POST'])
 @jwt_required()
+@roles_required('admin', 'hr')
 def create_training_program():
     """إضافة برنامج تدريبي"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if current_user.role not in ['admin', 'hr']:
-            return jsonify({
-                'success': False,
-                'message': 'ليس لديك صلاحية'
-            }), 403
-        
         data = request.get_json()
         
         if not data.get('name') or not data.get('start_date') or not data.get('end_date'):
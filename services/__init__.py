@@ -0,0 +1,3 @@
+"""
+خدمات منطق الأعمال المشتركة بين المسارات
+"""
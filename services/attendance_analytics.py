@@ -0,0 +1,312 @@
+"""
+تحليلات الحضور بالجملة (NumPy)
+
+- تحميل سجلات الفترة مرة واحدة كأعمدة رقمية (موظف، يوم، ثواني الدخول والخروج، الحالة)
+  مع أيام طلبات الإجازة المعتمدة (اليوم مغطى بها ولو لم يُسجل له حضور بحالة leave)
+- حساب التأخير والعمل الإضافي والغياب ومعامل برادفورد لكل الموظفين والإدارات
+  بتمريرة واحدة من العمليات المتجهة (bincount / unique / busday_count) بدون حلقات Python
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+from config.database import db
+from models.attendance import Attendance
+from models.department import Department
+from models.employee import Employee
+from models.leave import LeaveRequest
+from services.presence import late_threshold
+from utils.sql import day_number, seconds_of_day
+
+# رموز الحالة في المصفوفات
+PRESENT, LATE, LEAVE, ABSENT, OTHER = range(5)
+
+MAX_PERIOD_DAYS = 366
+SORT_FIELDS = (
+    'bradford_factor', 'absent_days', 'absenteeism_rate', 'late_days', 'late_minutes', 'overtime_hours'
+)
+
+
+def _seconds(moment):
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+def load_period(start, end, department_id=None):
+    """
+    تحميل سجلات الحضور للفترة كمصفوفات (مستعلم واحد بمؤشر من جهة الخادم)
+
+    يعيد قاموس أعمدة: employee_id, day (أيام منذ 1970), check_in, check_out (ثوانٍ أو NaN), status
+    """
+    status_code = db.case(
+        (Attendance.status == 'present', PRESENT),
+        (Attendance.status == 'late', LATE),
+        (Attendance.status == 'leave', LEAVE),
+        (Attendance.status == 'absent', ABSENT),
+        else_=OTHER
+    )
+    statement = db.select(
+        Attendance.employee_id,
+        day_number(Attendance.date),
+        seconds_of_day(Attendance.check_in),
+        seconds_of_day(Attendance.check_out),
+        status_code
+    ).where(Attendance.date.between(start, end))
+    if department_id is not None:
+        statement = statement.join(Employee, Employee.id == Attendance.employee_id).where(
+            Employee.department_id == department_id
+        )
+
+    chunks = []
+    # تنفيذ Core مباشرة على الاتصال (بدون طبقة ORM لكل صف)
+    result = db.session.connection().execution_options(yield_per=50000).execute(statement)
+    for partition in result.partitions():
+        # تحويل الصفوف إلى tuple أولاً (أسرع بكثير من تمرير كائنات Row إلى NumPy)
+        chunks.append(np.array([tuple(row) for row in partition], dtype=np.float64))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 5))
+
+    return {
+        'employee_id': data[:, 0].astype(np.int64),
+        'day': data[:, 1].astype(np.int64),
+        'check_in': data[:, 2],
+        'check_out': data[:, 3],
+        'status': data[:, 4].astype(np.int8)
+    }
+
+
+def load_leaves(start, end, department_id=None):
+    """
+    أيام طلبات الإجازة المعتمدة داخل [start, end] (يوم لكل صف)
+
+    يعيد قاموس أعمدة: employee_id, day (datetime64[D])
+    """
+    statement = db.select(
+        LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date
+    ).where(
+        LeaveRequest.status == 'approved',
+        LeaveRequest.start_date <= end,
+        LeaveRequest.end_date >= start
+    )
+    if department_id is not None:
+        statement = statement.join(Employee, Employee.id == LeaveRequest.employee_id).where(
+            Employee.department_id == department_id
+        )
+
+    rows = db.session.connection().execute(statement).all()
+    employees = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    first = np.maximum(np.array([row[1] for row in rows], dtype='datetime64[D]'), np.datetime64(start, 'D'))
+    last = np.minimum(np.array([row[2] for row in rows], dtype='datetime64[D]'), np.datetime64(end, 'D'))
+    lengths = np.maximum((last - first).astype(np.int64) + 1, 0)
+
+    # توسيع كل نطاق إلى أيامه: إزاحة كل يوم عن بداية نطاقه
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return {
+        'employee_id': np.repeat(employees, lengths),
+        'day': np.repeat(first, lengths) + offsets
+    }
+
+
+def _positions(ids, employee_ids):
+    """مواقع المعرفات في ids المرتبة مع قناع المعروف منها (غير النشطين خارجه)"""
+    position = np.clip(np.searchsorted(ids, employee_ids), 0, max(len(ids) - 1, 0))
+    known = (ids[position] == employee_ids) if len(ids) else np.zeros(len(employee_ids), dtype=bool)
+    return position[known], known
+
+
+def _employees(start, department_id=None):
+    """الموظفون النشطون مرتبين حسب الرقم: (المعرفات، الإدارات، يوم بداية الاحتساب)"""
+    statement = db.select(
+        Employee.id, Employee.department_id, Employee.hire_date
+    ).where(Employee.status == 'active').order_by(Employee.id)
+    if department_id is not None:
+        statement = statement.where(Employee.department_id == department_id)
+
+    rows = db.session.execute(statement).all()
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    departments = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    begins = np.array([max(row[2] or start, start) for row in rows], dtype='datetime64[D]')
+    return ids, departments, begins
+
+
+def analyze(start, end, department_id=None):
+    """
+    مؤشرات الحضور لكل موظف ولكل إدارة في الفترة [start, end]
+
+    - التأخير: الدخول بعد بداية الدوام + فترة السماح (أو الحالة late)، بالدقائق من بداية الدوام
+    - العمل الإضافي: ما زاد عن ATTENDANCE_STANDARD_HOURS في اليوم
+    - الغياب: أيام العمل المتوقعة (ATTENDANCE_WEEKMASK، من تاريخ التعيين) بدون حضور أو إجازة
+      (سجل بحالة leave أو طلب إجازة معتمد، واليوم يُحتسب مرة واحدة)
+    - معامل برادفورد: S² × D (S فترات الغياب المتصلة، D أيام الغياب)
+    """
+    config = current_app.config
+    weekmask = config.get('ATTENDANCE_WEEKMASK', 'Sun Mon Tue Wed Thu')
+    standard_seconds = config.get('ATTENDANCE_STANDARD_HOURS', 8) * 3600
+    shift_start = datetime.strptime(config.get('ATTENDANCE_SHIFT_START', '08:00'), '%H:%M').time()
+    shift_seconds = _seconds(shift_start)
+    late_seconds = _seconds(late_threshold())
+
+    ids, departments, begins = _employees(start, department_id)
+    n = len(ids)
+    period_start = np.datetime64(start, 'D')
+    period_end = np.datetime64(end + timedelta(days=1), 'D')
+
+    records = load_period(start, end, department_id)
+    leaves = load_leaves(start, end, department_id)
+
+    # ربط كل سجل بموقع موظفه (وتجاهل غير النشطين)
+    position, known = _positions(ids, records['employee_id'])
+    days = records['day'][known].astype('datetime64[D]')
+    check_in = records['check_in'][known]
+    check_out = records['check_out'][known]
+    status = records['status'][known]
+
+    def per_employee(mask, weights=None):
+        return np.bincount(
+            position[mask], weights=None if weights is None else weights[mask], minlength=n
+        )
+
+    present = (status == PRESENT) | (status == LATE)
+    leave_position, leave_known = _positions(ids, leaves['employee_id'])
+    leave_days = leaves['day'][leave_known]
+
+    span = int((period_end - period_start).astype(np.int64))
+
+    def unique_days(mask):
+        """(المواقع، الأيام) بدون تكرار لسجلات mask مع أيام طلبات الإجازة، مرتبة حسب الموظف ثم اليوم"""
+        keys = np.unique(np.concatenate((
+            position[mask] * span + (days[mask] - period_start).astype(np.int64),
+            leave_position * span + (leave_days - period_start).astype(np.int64)
+        )))
+        return keys // span, period_start + keys % span
+
+    cover_position, cover_days = unique_days(present | (status == LEAVE))
+    on_leave_position, _ = unique_days(status == LEAVE)
+
+    # التأخير
+    late = (status == LATE) | ((status == PRESENT) & (check_in > late_seconds))
+    late_minutes = np.where(late & ~np.isnan(check_in), np.maximum(check_in - shift_seconds, 0) / 60, 0)
+
+    # ساعات العمل والعمل الإضافي
+    worked = check_out - check_in
+    valid = ~np.isnan(worked) & (worked > 0)
+    worked = np.where(valid, worked, 0)
+    overtime = np.maximum(worked - standard_seconds, 0)
+
+    # الغياب: أيام العمل المتوقعة ناقص الأيام المغطاة (حضور أو إجازة) في أيام العمل
+    expected = np.busday_count(begins, period_end, weekmask=weekmask) if n else np.zeros(0, dtype=np.int64)
+    expected = np.maximum(expected, 0)
+    working = np.is_busday(cover_days, weekmask=weekmask) & (cover_days >= begins[cover_position])
+    covered_days = np.bincount(cover_position[working], minlength=n)
+    absent_days = np.maximum(expected - covered_days, 0)
+
+    # فترات الغياب المتصلة: فجوات بين الأيام المغطاة على تقويم أيام العمل (مرتبة مسبقاً من unique)
+    employee_index = cover_position[working]
+    business_day = np.busday_count(period_start, cover_days[working], weekmask=weekmask)
+
+    same = employee_index[1:] == employee_index[:-1]
+    internal_gaps = np.bincount(
+        employee_index[1:][same & (np.diff(business_day) > 1)], minlength=n
+    )
+    first = np.full(n, -1, dtype=np.int64)
+    last = np.full(n, -1, dtype=np.int64)
+    if len(employee_index):
+        starts = np.concatenate(([True], ~same))
+        ends = np.concatenate((~same, [True]))
+        first[employee_index[starts]] = business_day[starts]
+        last[employee_index[ends]] = business_day[ends]
+
+    begin_index = np.busday_count(period_start, begins, weekmask=weekmask) if n else first
+    total_business_days = np.busday_count(period_start, period_end, weekmask=weekmask)
+    has_cover = first >= 0
+    spells = (
+        internal_gaps
+        + (has_cover & (first > begin_index))
+        + (has_cover & (last < total_business_days - 1))
+        + (~has_cover & (expected > 0))
+    )
+    bradford = spells ** 2 * absent_days
+
+    metrics = {
+        'expected_days': expected,
+        'present_days': per_employee(present),
+        'leave_days': np.bincount(on_leave_position, minlength=n),
+        'absent_days': absent_days,
+        'absence_spells': spells,
+        'absenteeism_rate': np.divide(absent_days, expected, out=np.zeros(n), where=expected > 0),
+        'bradford_factor': bradford,
+        'late_days': per_employee(late),
+        'late_minutes': per_employee(np.ones(len(position), dtype=bool), late_minutes),
+        'worked_hours': per_employee(np.ones(len(position), dtype=bool), worked) / 3600,
+        'overtime_hours': per_employee(np.ones(len(position), dtype=bool), overtime) / 3600
+    }
+
+    return ids, departments, metrics
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def period_report(start, end, department_id=None, sort='bradford_factor', limit=50):
+    """تقرير الفترة: ملخص لكل إدارة + أعلى الموظفين حسب مؤشر محدد"""
+    ids, departments, metrics = analyze(start, end, department_id)
+
+    # تجميع الإدارات
+    department_ids, inverse = np.unique(departments, return_inverse=True)
+
+    def per_department(values):
+        return np.bincount(inverse, weights=values, minlength=len(department_ids))
+
+    headcount = np.bincount(inverse, minlength=len(department_ids))
+    totals = {
+        name: per_department(metrics[name].astype(np.float64))
+        for name in ('expected_days', 'present_days', 'absent_days', 'late_days',
+                     'late_minutes', 'overtime_hours', 'bradford_factor')
+    }
+
+    names = dict(db.session.execute(
+        db.select(Department.id, Department.name).where(Department.id.in_(department_ids.tolist()))
+    ).all())
+
+    department_rows = []
+    for i, department in enumerate(department_ids.tolist()):
+        expected = totals['expected_days'][i]
+        department_rows.append({
+            'department_id': department or None,
+            'department_name': names.get(department),
+            'headcount': int(headcount[i]),
+            'present_days': int(totals['present_days'][i]),
+            'absent_days': int(totals['absent_days'][i]),
+            'absenteeism_rate': _round(totals['absent_days'][i] / expected) if expected else 0.0,
+            'late_days': int(totals['late_days'][i]),
+            'late_minutes': _round(totals['late_minutes'][i]),
+            'overtime_hours': _round(totals['overtime_hours'][i]),
+            'avg_bradford_factor': _round(totals['bradford_factor'][i] / headcount[i]) if headcount[i] else 0.0
+        })
+
+    # أعلى الموظفين حسب المؤشر المطلوب (argpartition بدلاً من ترتيب الكل)
+    values = metrics[sort]
+    count = min(limit, len(ids))
+    top = np.argpartition(-values, count - 1)[:count] if count else np.array([], dtype=np.int64)
+    top = top[np.argsort(-values[top], kind='stable')]
+
+    employee_rows = []
+    for i in top.tolist():
+        row = {'employee_id': int(ids[i]), 'department_id': int(departments[i]) or None}
+        for name, column in metrics.items():
+            value = column[i]
+            row[name] = _round(value) if column.dtype.kind == 'f' else int(value)
+        employee_rows.append(row)
+
+    expected_total = metrics['expected_days'].sum()
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'employees': int(len(ids)),
+        'absenteeism_rate': _round(metrics['absent_days'].sum() / expected_total) if expected_total else 0.0,
+        'late_days': int(metrics['late_days'].sum()),
+        'overtime_hours': _round(metrics['overtime_hours'].sum()),
+        'departments': department_rows,
+        'top_employees': employee_rows
+    }
+
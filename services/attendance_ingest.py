@@ -0,0 +1,291 @@
+"""
+استقبال بصمات الحضور بالجملة من أجهزة البصمة
+
+- كل بصمة تُحفظ في attendance_punches بقيد فريد، فإعادة رفع نفس الدفعة لا تكرر شيئاً
+- البصمات الجديدة تُدمج مع سجلات الحضور (موظف، يوم) عبر upsert: أول دخول وآخر خروج
+- القراءة والكتابة على شكل مجموعات (استعلام لكل دفعة وليس لكل بصمة)
+- الحضور والانصراف الفردي عبارة واحدة لكل منهما (بدون SELECT ثم INSERT)
+- ملخص الحضور الشهري للأيام المتأثرة يُحدَّث في نفس المعاملة، وخرائط الحضور عند القراءة التالية
+"""
+from datetime import datetime
+
+from config.database import db
+from models.attendance import Attendance
+from models.attendance_punch import AttendancePunch
+from models.employee import Employee
+from services.attendance_rollup import refresh_rollups
+from services.presence import presence_index
+from utils.sql import dialect_insert, insert_ignore, least, greatest, hours_between
+
+DIRECTIONS = ('in', 'out')
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _parse_timestamp(value):
+    if not isinstance(value, str):
+        raise ValueError
+    timestamp = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        # الحضور يُخزن بالتوقيت المحلي للخادم
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp.replace(microsecond=0)
+
+
+def parse_punch(record):
+    """تحويل بصمة خام إلى (القيم، الأخطاء)"""
+    if not isinstance(record, dict):
+        return None, ['صيغة البصمة غير صالحة']
+
+    errors = []
+    values = {
+        'employee_id': record.get('employee_id'),
+        'employee_number': record.get('employee_number'),
+        'direction': str(record.get('direction') or '').lower(),
+        'device_id': record.get('device_id')
+    }
+
+    if values['employee_id'] is not None:
+        try:
+            values['employee_id'] = int(values['employee_id'])
+        except (TypeError, ValueError):
+            errors.append('رقم الموظف يجب أن يكون رقماً صحيحاً')
+    elif not values['employee_number']:
+        errors.append('الحقل employee_id أو employee_number مطلوب')
+
+    if values['direction'] not in DIRECTIONS:
+        errors.append('الاتجاه يجب أن يكون in أو out')
+
+    try:
+        values['punched_at'] = _parse_timestamp(record.get('timestamp'))
+    except ValueError:
+        errors.append('صيغة الوقت غير صحيحة (ISO 8601)')
+
+    return values, errors
+
+
+def _resolve_employees(punches):
+    """ربط أرقام الموظفين بالمعرفات والتحقق من وجودهم (استعلام لكل 500 قيمة)"""
+    ids = {p['employee_id'] for p in punches if p['employee_id'] is not None}
+    numbers = {str(p['employee_number']) for p in punches if p['employee_id'] is None}
+
+    known_ids = set()
+    for chunk in _chunks(ids):
+        known_ids.update(db.session.scalars(db.select(Employee.id).where(Employee.id.in_(chunk))))
+
+    by_number = {}
+    for chunk in _chunks(numbers):
+        by_number.update(db.session.execute(
+            db.select(Employee.employee_number, Employee.id).where(Employee.employee_number.in_(chunk))
+        ).all())
+
+    return known_ids, by_number
+
+
+def record_check_in(employee_id, moment):
+    """
+    تسجيل حضور بعبارة واحدة: INSERT ... ON CONFLICT (employee_id, date) DO NOTHING
+
+    يعيد سجل الحضور الجديد أو None إذا كان الحضور مسجلاً مسبقاً لهذا اليوم
+    """
+    statement = insert_ignore(Attendance, ['employee_id', 'date']).values(
+        employee_id=employee_id,
+        date=moment.date(),
+        check_in=moment.time(),
+        status='present'
+    ).returning(Attendance)
+    attendance = db.session.scalars(statement).first()
+    if attendance is not None:
+        refresh_rollups([(employee_id, attendance.date)])
+        presence_index.expire()
+    return attendance
+
+
+def record_check_out(employee_id, moment):
+    """
+    تسجيل انصراف بعبارة UPDATE شرطية واحدة (فقط إذا لم يُسجل الانصراف بعد)
+
+    يعيد سجل الحضور المحدث أو None إذا لم يوجد حضور أو سبق تسجيل الانصراف
+    """
+    check_out = db.literal(moment.time(), db.Time)
+    statement = db.update(Attendance).where(
+        Attendance.employee_id == employee_id,
+        Attendance.date == moment.date(),
+        Attendance.check_out.is_(None)
+    ).values(
+        check_out=check_out,
+        work_hours=hours_between(Attendance.check_in, check_out),
+        updated_at=datetime.utcnow()
+    ).returning(Attendance).execution_options(synchronize_session=False)
+    attendance = db.session.scalars(statement).first()
+    if attendance is not None:
+        refresh_rollups([(employee_id, attendance.date)])
+        presence_index.expire()
+    return attendance
+
+
+def _merge_into_attendance(punches):
+    """دمج البصمات المقبولة في سجلات الحضور بعبارة upsert واحدة لكل دفعة"""
+    days = {}
+    for punch in punches:
+        key = (punch['employee_id'], punch['punched_at'].date())
+        day = days.setdefault(key, {'in': [], 'out': []})
+        day[punch['direction']].append(punch['punched_at'].time())
+
+    now = datetime.utcnow()
+    rows = []
+    for (employee_id, day), times in days.items():
+        record = Attendance(
+            check_in=min(times['in']) if times['in'] else None,
+            check_out=max(times['out']) if times['out'] else None
+        )
+        record.calculate_work_hours()
+        rows.append({
+            'employee_id': employee_id,
+            'date': day,
+            'check_in': record.check_in,
+            'check_out': record.check_out,
+            'work_hours': record.work_hours,
+            'status': 'present',
+            'created_at': now,
+            'updated_at': now
+        })
+
+    # أول دخول وآخر خروج بين السجل الموجود والبصمات الجديدة
+    statement = dialect_insert(Attendance)
+    check_in = least(Attendance.check_in, statement.excluded.check_in)
+    check_out = greatest(Attendance.check_out, statement.excluded.check_out)
+    statement = statement.on_conflict_do_update(
+        index_elements=['employee_id', 'date'],
+        set_={
+            'check_in': check_in,
+            'check_out': check_out,
+            'work_hours': hours_between(check_in, check_out),
+            'updated_at': statement.excluded.updated_at
+        }
+    )
+    db.session.execute(statement, rows)
+    refresh_rollups(days.keys())
+    presence_index.expire()
+    return len(rows)
+
+
+def merge_duplicate_days():
+    """
+    دمج سجلات الحضور المكررة لنفس (الموظف، اليوم) في أقدمها: أول دخول وآخر خروج (بدون commit)
+
+    لقواعد بيانات سبقت القيد الفريد uq_attendance_employee_date، ويعيد عدد السجلات المحذوفة
+    """
+    groups = db.session.execute(
+        db.select(
+            Attendance.employee_id,
+            Attendance.date,
+            db.func.min(Attendance.id),
+            db.func.min(Attendance.check_in),
+            db.func.max(Attendance.check_out)
+        ).group_by(Attendance.employee_id, Attendance.date).having(db.func.count() > 1)
+    ).all()
+
+    removed = 0
+    for employee_id, day, keep_id, check_in, check_out in groups:
+        record = db.session.get(Attendance, keep_id)
+        record.check_in = check_in
+        record.check_out = check_out
+        record.calculate_work_hours()
+        removed += db.session.execute(
+            db.delete(Attendance).where(
+                Attendance.employee_id == employee_id,
+                Attendance.date == day,
+                Attendance.id != keep_id
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+    if groups:
+        db.session.flush()
+        refresh_rollups([(employee_id, day) for employee_id, day, *_ in groups])
+        presence_index.expire()
+    return removed
+
+
+def ingest_punches(records):
+    """
+    حفظ دفعة بصمات ودمجها في سجلات الحضور (بدون commit)
+
+    يعيد تقريراً بعدد المقبول والمكرر والمرفوض ونتيجة كل بصمة حسب ترتيبها
+    """
+    results = [None] * len(records)
+    candidates = []
+    for index, record in enumerate(records):
+        values, errors = parse_punch(record)
+        if errors:
+            results[index] = {'index': index, 'status': 'rejected', 'errors': errors}
+        else:
+            values['index'] = index
+            candidates.append(values)
+
+    known_ids, by_number = _resolve_employees(candidates)
+
+    punches = []
+    seen = set()
+    for punch in candidates:
+        if punch['employee_id'] is None:
+            punch['employee_id'] = by_number.get(str(punch['employee_number']))
+        elif punch['employee_id'] not in known_ids:
+            punch['employee_id'] = None
+        if punch['employee_id'] is None:
+            results[punch['index']] = {'index': punch['index'], 'status': 'rejected', 'errors': ['الموظف غير موجود']}
+            continue
+
+        key = (punch['employee_id'], punch['punched_at'], punch['direction'])
+        if key in seen:
+            results[punch['index']] = {'index': punch['index'], 'status': 'duplicate'}
+            continue
+        seen.add(key)
+        punches.append(punch)
+
+    inserted = set()
+    if punches:
+        statement = insert_ignore(
+            AttendancePunch, ['employee_id', 'punched_at', 'direction']
+        ).returning(
+            AttendancePunch.employee_id, AttendancePunch.punched_at, AttendancePunch.direction
+        )
+        now = datetime.utcnow()
+        params = [{
+            'employee_id': p['employee_id'],
+            'punched_at': p['punched_at'],
+            'direction': p['direction'],
+            'device_id': p['device_id'],
+            'created_at': now
+        } for p in punches]
+        inserted = {tuple(row) for row in db.session.execute(statement, params)}
+
+    accepted = []
+    for punch in punches:
+        key = (punch['employee_id'], punch['punched_at'], punch['direction'])
+        if key in inserted:
+            accepted.append(punch)
+            status = 'accepted'
+        else:
+            status = 'duplicate'
+        results[punch['index']] = {
+            'index': punch['index'],
+            'status': status,
+            'employee_id': punch['employee_id'],
+            'date': punch['punched_at'].date().isoformat()
+        }
+
+    attendance_days = _merge_into_attendance(accepted) if accepted else 0
+
+    return {
+        'total': len(records),
+        'accepted': len(accepted),
+        'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+        'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+        'attendance_days': attendance_days,
+        'results': results
+    }
@@ -0,0 +1,170 @@
+"""
+ملخص الحضور الشهري لكل موظف
+
+- يُعاد حساب ملخص (موظف، شهر) من سجلات ذلك الشهر فقط داخل نفس معاملة الكتابة
+  (نطاق تاريخ يستخدم فهرس employee_id, date بدلاً من extract على كل السجلات)
+- rebuild_rollups يعيد بناء الجدول بالكامل (أمر flask rebuild-attendance-rollups)
+- التأخير بنفس قاعدة services.presence.is_late: الحالة late، أو present مع دخول بعد
+  late_threshold() (أيام التأخير تُحتسب ضمن أيام الحضور أيضاً)
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from config.database import db
+from models.attendance import Attendance
+from models.attendance_rollup import AttendanceMonthlyRollup
+from services.presence import late_threshold
+from utils.sql import dialect_insert
+
+ROLLUP_COLUMNS = (
+    'total_days', 'present_days', 'absent_days', 'late_days', 'total_hours', 'hours_days'
+)
+
+
+def month_bounds(year, month):
+    """[أول يوم في الشهر، أول يوم في الشهر التالي)"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def _count(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def aggregate_columns():
+    """أعمدة التجميع بنفس ترتيب ROLLUP_COLUMNS"""
+    late = db.or_(
+        Attendance.status == 'late',
+        db.and_(Attendance.status == 'present', Attendance.check_in > late_threshold())
+    )
+    return (
+        db.func.count(Attendance.id).label('total_days'),
+        _count(Attendance.status.in_(('present', 'late'))).label('present_days'),
+        _count(Attendance.status == 'absent').label('absent_days'),
+        _count(late).label('late_days'),
+        db.func.coalesce(db.func.sum(Attendance.work_hours), 0).label('total_hours'),
+        db.func.count(Attendance.work_hours).label('hours_days')
+    )
+
+
+def _upsert(select, now):
+    columns = ('employee_id', 'year', 'month') + ROLLUP_COLUMNS + ('updated_at',)
+    statement = dialect_insert(AttendanceMonthlyRollup)
+    statement = statement.from_select(
+        columns, select.add_columns(db.literal(now, db.DateTime).label('updated_at'))
+    ).on_conflict_do_update(
+        index_elements=['employee_id', 'year', 'month'],
+        set_={column: statement.excluded[column] for column in ROLLUP_COLUMNS + ('updated_at',)}
+    )
+    db.session.execute(statement)
+
+
+def refresh_rollups(keys):
+    """إعادة حساب الملخصات لمجموعة (employee_id, تاريخ) - عبارتان لكل شهر متأثر"""
+    months = defaultdict(set)
+    for employee_id, day in keys:
+        months[(day.year, day.month)].add(employee_id)
+
+    now = datetime.utcnow()
+    for (year, month), employee_ids in months.items():
+        start, end = month_bounds(year, month)
+        employee_ids = list(employee_ids)
+        for i in range(0, len(employee_ids), 500):
+            chunk = employee_ids[i:i + 500]
+            # حذف ثم إدخال حتى لا يبقى ملخص لشهر حُذفت سجلاته
+            db.session.execute(db.delete(AttendanceMonthlyRollup).where(
+                AttendanceMonthlyRollup.employee_id.in_(chunk),
+                AttendanceMonthlyRollup.year == year,
+                AttendanceMonthlyRollup.month == month
+            ))
+            _upsert(
+                db.select(
+                    Attendance.employee_id,
+                    db.literal(year).label('year'),
+                    db.literal(month).label('month'),
+                    *aggregate_columns()
+                ).where(
+                    Attendance.employee_id.in_(chunk),
+                    Attendance.date >= start,
+                    Attendance.date < end
+                ).group_by(Attendance.employee_id),
+                now
+            )
+
+
+def rebuild_rollups():
+    """إعادة بناء جميع الملخصات من جدول الحضور، يعيد عدد الملخصات"""
+    year = db.extract('year', Attendance.date)
+    month = db.extract('month', Attendance.date)
+
+    db.session.execute(db.delete(AttendanceMonthlyRollup))
+    _upsert(
+        db.select(
+            Attendance.employee_id,
+            year.label('year'),
+            month.label('month'),
+            *aggregate_columns()
+        ).where(Attendance.date.isnot(None)).group_by(Attendance.employee_id, year, month),
+        datetime.utcnow()
+    )
+    return db.session.scalar(db.select(db.func.count()).select_from(AttendanceMonthlyRollup))
+
+
+def employee_month_stats(employee_id, year, month):
+    """
+    إحصائيات موظف لشهر من الملخص
+
+    إذا لم يوجد ملخص (بيانات أُدخلت خارج مسارات الحضور قبل إعادة البناء)
+    يتم التجميع مباشرة بنطاق تاريخ على الفهرس
+    """
+    rollup = db.session.get(AttendanceMonthlyRollup, (employee_id, year, month))
+    if rollup is not None:
+        return rollup.to_dict()
+
+    start, end = month_bounds(year, month)
+    row = db.session.execute(
+        db.select(*aggregate_columns()).where(
+            Attendance.employee_id == employee_id,
+            Attendance.date >= start,
+            Attendance.date < end
+        )
+    ).one()
+    stats = dict(row._mapping)
+    hours_days = stats.pop('hours_days')
+    stats['total_hours'] = float(stats['total_hours'] or 0)
+    stats['avg_hours'] = stats['total_hours'] / hours_days if hours_days else 0
+    stats.update(employee_id=employee_id, year=year, month=month)
+    return stats
+
+
+def department_month_stats(year, month):
+    """إحصائيات الحضور لكل إدارة لشهر (تجميع الملخصات وليس سجلات الحضور)"""
+    from models.employee import Employee
+    from models.department import Department
+
+    rollup = AttendanceMonthlyRollup
+    rows = db.session.execute(
+        db.select(
+            Employee.department_id,
+            Department.name.label('department_name'),
+            db.func.count(rollup.employee_id).label('employees'),
+            *[db.func.sum(getattr(rollup, column)).label(column) for column in ROLLUP_COLUMNS]
+        ).join(
+            Employee, Employee.id == rollup.employee_id
+        ).outerjoin(
+            Department, Department.id == Employee.department_id
+        ).where(
+            rollup.year == year,
+            rollup.month == month
+        ).group_by(Employee.department_id, Department.name).order_by(Department.name)
+    )
+
+    stats = []
+    for row in rows:
+        data = dict(row._mapping)
+        hours_days = data.pop('hours_days')
+        data['total_hours'] = float(data['total_hours'] or 0)
+        data['avg_hours'] = data['total_hours'] / hours_days if hours_days else 0
+        stats.append(data)
+    return stats
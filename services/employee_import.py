@@ -0,0 +1,193 @@
+"""
+استيراد الموظفين بالجملة من ملفات CSV أو NDJSON
+
+- قراءة الملف سطراً بسطر دون تحميله كاملاً في الذاكرة
+- التحقق من تكرار البريد ورقم الهوية ومن الإدارة والمسمى والمدير عبر مجموعات محملة
+  مسبقاً (بدون استعلام لكل صف)
+- الإدخال على دفعات داخل معاملة واحدة ثم تحديث عدد موظفي الإدارات مرة واحدة
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from config.database import db
+from models.employee import Employee
+from models.department import Department
+from models.job_title import JobTitle
+from services import employee_search
+from utils.cache import stats_cache
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email', 'national_id', 'hire_date')
+
+TEXT_FIELDS = (
+    'employee_number', 'first_name', 'last_name', 'email', 'phone', 'gender',
+    'national_id', 'marital_status', 'address', 'city', 'country',
+    'employment_type', 'work_location'
+)
+DATE_FIELDS = ('hire_date', 'date_of_birth')
+INTEGER_FIELDS = ('department_id', 'job_title_id', 'manager_id')
+FLOAT_FIELDS = ('salary',)
+
+
+def iter_records(stream, fmt):
+    """قراءة السجلات من ملف ثنائي كمولّد (رقم السطر، القاموس)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, record if isinstance(record, dict) else None
+    else:
+        reader = csv.DictReader(text)
+        for record in reader:
+            # رقم السطر في الملف (السطر الأول للعناوين)
+            yield reader.line_num, record
+
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def parse_record(record):
+    """تحويل سجل خام إلى قيم أعمدة الموظف، يعيد (القيم، الأخطاء)"""
+    if record is None:
+        return None, ['صيغة السطر غير صالحة']
+
+    values = {}
+    errors = []
+
+    for field in TEXT_FIELDS:
+        value = _clean(record.get(field))
+        values[field] = str(value) if value is not None else None
+
+    for field in REQUIRED_FIELDS:
+        if not _clean(record.get(field)):
+            errors.append(f'الحقل {field} مطلوب')
+
+    for field in DATE_FIELDS:
+        value = _clean(record.get(field))
+        if value is None:
+            values[field] = None
+            continue
+        try:
+            values[field] = datetime.strptime(str(value), '%Y-%m-%d').date()
+        except ValueError:
+            errors.append(f'صيغة التاريخ في الحقل {field} غير صحيحة')
+
+    for field in INTEGER_FIELDS:
+        value = _clean(record.get(field))
+        try:
+            values[field] = int(value) if value is not None else None
+        except (TypeError, ValueError):
+            errors.append(f'قيمة الحقل {field} يجب أن تكون رقماً صحيحاً')
+
+    for field in FLOAT_FIELDS:
+        value = _clean(record.get(field))
+        try:
+            values[field] = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            errors.append(f'قيمة الحقل {field} يجب أن تكون رقماً')
+
+    values['status'] = 'active'
+    return values, errors
+
+
+def import_employees(stream, fmt='csv', chunk_size=1000):
+    """
+    استيراد الموظفين من ملف مفتوح
+
+    يعيد تقريراً: عدد الصفوف والمضافين والأخطاء لكل صف
+    """
+    # تحميل القيم الفريدة الحالية مرة واحدة
+    emails = set(db.session.scalars(db.select(Employee.email).where(Employee.email.isnot(None))))
+    national_ids = set(db.session.scalars(
+        db.select(Employee.national_id).where(Employee.national_id.isnot(None))
+    ))
+    employee_numbers = set(db.session.scalars(db.select(Employee.employee_number)))
+    department_ids = set(db.session.scalars(db.select(Department.id)))
+    job_title_ids = set(db.session.scalars(db.select(JobTitle.id)))
+    # المدير يجب أن يكون موظفاً موجوداً قبل الاستيراد (manager_id مفتاح أجنبي)
+    manager_ids = set(db.session.scalars(db.select(Employee.id)))
+
+    stamp = datetime.now().strftime('%y%m%d%H%M%S')
+    sequence = 0
+
+    total_rows = 0
+    imported = 0
+    errors = []
+    touched_departments = set()
+    batch = []
+
+    def flush(batch):
+        ids = db.session.scalars(db.insert(Employee).returning(Employee.id), batch).all()
+        employee_search.index_employees(db.session.connection(), ids)
+        return len(ids)
+
+    for line_number, record in iter_records(stream, fmt):
+        total_rows += 1
+        values, row_errors = parse_record(record)
+
+        if values is not None:
+            if values['email'] in emails:
+                row_errors.append('البريد الإلكتروني مستخدم مسبقاً')
+            if values['national_id'] in national_ids:
+                row_errors.append('رقم الهوية مستخدم مسبقاً')
+            if values['employee_number'] and values['employee_number'] in employee_numbers:
+                row_errors.append('رقم الموظف مستخدم مسبقاً')
+            if values.get('department_id') and values['department_id'] not in department_ids:
+                row_errors.append('الإدارة غير موجودة')
+            if values.get('job_title_id') and values['job_title_id'] not in job_title_ids:
+                row_errors.append('المسمى الوظيفي غير موجود')
+            if values.get('manager_id') and values['manager_id'] not in manager_ids:
+                row_errors.append('المدير غير موجود')
+
+        if row_errors:
+            errors.append({'row': line_number, 'errors': row_errors})
+            continue
+
+        if not values['employee_number']:
+            while True:
+                sequence += 1
+                candidate = f"EMP{stamp}{sequence:06d}"
+                if candidate not in employee_numbers:
+                    break
+            values['employee_number'] = candidate
+
+        emails.add(values['email'])
+        national_ids.add(values['national_id'])
+        employee_numbers.add(values['employee_number'])
+        if values['department_id']:
+            touched_departments.add(values['department_id'])
+
+        batch.append(values)
+        if len(batch) >= chunk_size:
+            imported += flush(batch)
+            batch = []
+
+    if batch:
+        imported += flush(batch)
+
+    if touched_departments:
+        Department.recount_employees(touched_departments)
+    if imported:
+        stats_cache.invalidate()
+
+    return {
+        'total_rows': total_rows,
+        'imported': imported,
+        'failed': len(errors),
+        'errors': errors
+    }
@@ -0,0 +1,186 @@
+"""
+فهرس البحث النصي للموظفين
+
+- SQLite: جدول FTS5 افتراضي (rowid = رقم الموظف)
+- PostgreSQL: جدول tsvector مع فهرس GIN
+- غير ذلك: الرجوع إلى LIKE
+
+النص المفهرس موحد عربياً (utils.arabic) ويتم تحديثه تلقائياً عند الإضافة والتعديل
+"""
+from config.database import db
+from models.employee import Employee
+from utils.arabic import search_tokens
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'employee_number')
+
+# fts5 أو tsvector أو None (يتم تحديده عند التهيئة)
+_backend = None
+
+
+def build_document(values):
+    """بناء النص المفهرس من قيم الحقول (مع فهرسة الكلمة بدون "ال" التعريف أيضاً)"""
+    tokens = []
+    for value in values:
+        for token in search_tokens(value):
+            tokens.append(token)
+            if token.startswith('ال') and len(token) > 4:
+                tokens.append(token[2:])
+    return ' '.join(tokens)
+
+
+def _detect_backend(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        try:
+            connection.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts "
+                "USING fts5(document, tokenize='unicode61 remove_diacritics 2')"
+            )
+            return 'fts5'
+        except Exception as e:
+            print(f"⚠️ FTS5 غير متاح، سيتم استخدام LIKE للبحث: {e}")
+            return None
+    if dialect == 'postgresql':
+        connection.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS employee_search ("
+            "employee_id INTEGER PRIMARY KEY REFERENCES employees(id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_employee_search_document "
+            "ON employee_search USING GIN (document)"
+        )
+        return 'tsvector'
+    return None
+
+
+def _index_rows(connection, rows):
+    """إضافة أو استبدال مستندات البحث لمجموعة (id, first_name, last_name, email, employee_number)"""
+    params = [{'id': row[0], 'document': build_document(row[1:])} for row in rows]
+    if not params or _backend is None:
+        return
+
+    if _backend == 'fts5':
+        connection.execute(
+            db.text("DELETE FROM employees_fts WHERE rowid = :id"),
+            [{'id': p['id']} for p in params]
+        )
+        connection.execute(
+            db.text("INSERT INTO employees_fts (rowid, document) VALUES (:id, :document)"),
+            params
+        )
+    else:
+        connection.execute(
+            db.text(
+                "INSERT INTO employee_search (employee_id, document) "
+                "VALUES (:id, to_tsvector('simple', :document)) "
+                "ON CONFLICT (employee_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            params
+        )
+
+
+def index_employees(connection, employee_ids):
+    """إعادة فهرسة موظفين محددين (للكتابات الجماعية التي تتجاوز أحداث ORM)"""
+    if _backend is None or not employee_ids:
+        return
+    columns = [Employee.id] + [getattr(Employee, f) for f in SEARCH_FIELDS]
+    ids = list(employee_ids)
+    for i in range(0, len(ids), 500):
+        rows = connection.execute(
+            db.select(*columns).where(Employee.id.in_(ids[i:i + 500]))
+        ).all()
+        _index_rows(connection, rows)
+
+
+def rebuild_search_index(connection, batch_size=1000):
+    """إعادة بناء الفهرس بالكامل"""
+    if _backend is None:
+        return
+    table = 'employees_fts' if _backend == 'fts5' else 'employee_search'
+    connection.exec_driver_sql(f"DELETE FROM {table}")
+
+    columns = [Employee.id] + [getattr(Employee, f) for f in SEARCH_FIELDS]
+    result = connection.execution_options(yield_per=batch_size).execute(db.select(*columns))
+    for rows in result.partitions():
+        _index_rows(connection, rows)
+
+
+def ensure_search_index():
+    """إنشاء فهرس البحث وملؤه إذا كان غير متزامن مع جدول الموظفين"""
+    global _backend
+    with db.engine.begin() as connection:
+        _backend = _detect_backend(connection)
+        if _backend is None:
+            return
+
+        table = 'employees_fts' if _backend == 'fts5' else 'employee_search'
+        indexed = connection.exec_driver_sql(f"SELECT count(*) FROM {table}").scalar()
+        total = connection.execute(db.select(db.func.count(Employee.id))).scalar()
+        if indexed != total:
+            rebuild_search_index(connection)
+            print(f"✅ تم بناء فهرس البحث ({total} موظف)")
+
+
+def search_subquery(term):
+    """استعلام فرعي (employee_id, rank) مرتب تصاعدياً حسب الصلة، أو None إذا لم يتوفر الفهرس"""
+    tokens = search_tokens(term)
+    if _backend is None or not tokens:
+        return None
+
+    if _backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        statement = db.text(
+            "SELECT rowid AS employee_id, bm25(employees_fts) AS rank "
+            "FROM employees_fts WHERE employees_fts MATCH :match"
+        )
+    else:
+        match = ' & '.join(f'{token}:*' for token in tokens)
+        statement = db.text(
+            "SELECT employee_id, -ts_rank(document, q) AS rank "
+            "FROM employee_search, to_tsquery('simple', :match) q "
+            "WHERE document @@ q"
+        )
+
+    return statement.bindparams(match=match).columns(
+        employee_id=db.Integer, rank=db.Float
+    ).subquery('employee_search_match')
+
+
+def apply_search(query, term):
+    """
+    تطبيق البحث على استعلام الموظفين
+
+    يعيد (الاستعلام، عمود الصلة أو None عند الرجوع إلى LIKE)
+    """
+    match = search_subquery(term)
+    if match is None:
+        return query.filter(
+            db.or_(*[getattr(Employee, f).like(f'%{term}%') for f in SEARCH_FIELDS])
+        ), None
+
+    query = query.join(match, match.c.employee_id == Employee.id)
+    return query, match.c.rank
+
+
+def _changed(target):
+    state = db.inspect(target)
+    return any(state.attrs[f].history.has_changes() for f in SEARCH_FIELDS)
+
+
+@db.event.listens_for(Employee, 'after_insert')
+@db.event.listens_for(Employee, 'after_update')
+def _sync_employee(mapper, connection, target):
+    if _backend is None or not _changed(target):
+        return
+    _index_rows(connection, [(target.id,) + tuple(getattr(target, f) for f in SEARCH_FIELDS)])
+
+
+@db.event.listens_for(Employee, 'after_delete')
+def _remove_employee(mapper, connection, target):
+    if _backend == 'fts5':
+        connection.execute(db.text("DELETE FROM employees_fts WHERE rowid = :id"), {'id': target.id})
+    elif _backend == 'tsvector':
+        connection.execute(
+            db.text("DELETE FROM employee_search WHERE employee_id = :id"), {'id': target.id}
+        )
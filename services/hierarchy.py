@@ -0,0 +1,207 @@
+"""
+الهياكل الشجرية (الهيكل الإداري للموظفين وشجرة الإدارات)
+
+كل دالة تنفذ استعلاماً واحداً باستخدام CTE تكراري بدلاً من التنقل عبر
+العلاقات الكسولة (subordinates / children) التي تنفذ استعلاماً لكل عقدة.
+"""
+from config.database import db
+from models.employee import Employee
+from models.department import Department
+from models.job_title import JobTitle
+
+MAX_DEPTH = 50
+
+
+def _node_columns(depth_column):
+    return (
+        Employee.id,
+        Employee.employee_number,
+        Employee.first_name,
+        Employee.last_name,
+        Employee.manager_id,
+        Employee.department_id,
+        Employee.job_title_id,
+        Department.name.label('department_name'),
+        JobTitle.title.label('job_title_name'),
+        depth_column
+    )
+
+
+def _with_names(statement):
+    return statement.outerjoin(
+        Department, Department.id == Employee.department_id
+    ).outerjoin(
+        JobTitle, JobTitle.id == Employee.job_title_id
+    )
+
+
+def _employee_node(row):
+    return {
+        'id': row.id,
+        'employee_number': row.employee_number,
+        'full_name': f"{row.first_name} {row.last_name}",
+        'manager_id': row.manager_id,
+        'department_id': row.department_id,
+        'department_name': row.department_name,
+        'job_title_id': row.job_title_id,
+        'job_title_name': row.job_title_name,
+        'depth': row.depth
+    }
+
+
+def reporting_subtree(employee_id, max_depth=MAX_DEPTH, active_only=True):
+    """شجرة المرؤوسين (المباشرين وغير المباشرين) لموظف، أو None إذا لم يوجد"""
+    tree = db.select(
+        Employee.id, db.literal(0).label('depth')
+    ).where(Employee.id == employee_id).cte('reporting_tree', recursive=True)
+
+    step = db.select(
+        Employee.id, (tree.c.depth + 1).label('depth')
+    ).join(tree, Employee.manager_id == tree.c.id).where(tree.c.depth < max_depth)
+    if active_only:
+        step = step.where(Employee.status == 'active')
+    tree = tree.union_all(step)
+
+    statement = _with_names(
+        db.select(*_node_columns(tree.c.depth)).join(tree, tree.c.id == Employee.id)
+    ).order_by(tree.c.depth, Employee.id)
+
+    rows = db.session.execute(statement).all()
+    if not rows:
+        return None
+
+    nodes = {}
+    root = None
+    for row in rows:
+        node = _employee_node(row)
+        node['children'] = []
+        # قد يظهر الموظف أكثر من مرة إذا وُجدت حلقة في البيانات
+        if node['id'] in nodes:
+            continue
+        nodes[node['id']] = node
+        if row.depth == 0:
+            root = node
+        elif row.manager_id in nodes:
+            nodes[row.manager_id]['children'].append(node)
+
+    root['total_subordinates'] = len(nodes) - 1
+    return root
+
+
+def management_chain(employee_id, max_depth=MAX_DEPTH):
+    """سلسلة المدراء من المدير المباشر حتى أعلى الهرم، أو None إذا لم يوجد الموظف"""
+    chain = db.select(
+        Employee.manager_id.label('id'), db.literal(1).label('depth')
+    ).where(Employee.id == employee_id).cte('management_chain', recursive=True)
+
+    chain = chain.union_all(
+        db.select(Employee.manager_id, (chain.c.depth + 1))
+        .join(chain, Employee.id == chain.c.id)
+        .where(Employee.manager_id.isnot(None), chain.c.depth < max_depth)
+    )
+
+    statement = _with_names(
+        db.select(*_node_columns(chain.c.depth)).join(chain, chain.c.id == Employee.id)
+    ).order_by(chain.c.depth)
+
+    chain_nodes = []
+    seen = set()
+    for row in db.session.execute(statement):
+        if row.id in seen:
+            break
+        seen.add(row.id)
+        chain_nodes.append(_employee_node(row))
+
+    # السلسلة الفارغة تعني موظفاً بلا مدير أو موظفاً غير موجود
+    if not chain_nodes and db.session.get(Employee, employee_id) is None:
+        return None
+    return chain_nodes
+
+
+def department_tree(root_id=None):
+    """
+    شجرة الإدارات مع العدد والرواتب المباشرة والمجمعة (الإدارة + جميع الإدارات الفرعية)
+
+    استعلام واحد: CTE إغلاق (ancestor, descendant) + تجميع الموظفين النشطين
+    """
+    # UNION (وليس UNION ALL) يوقف التكرار تلقائياً إذا وُجدت حلقة في parent_id
+    closure = db.select(
+        Department.id.label('ancestor_id'),
+        Department.id.label('descendant_id')
+    ).where(Department.is_active == True).cte('department_closure', recursive=True)
+
+    closure = closure.union(
+        db.select(closure.c.ancestor_id, Department.id)
+        .join(closure, Department.parent_id == closure.c.descendant_id)
+        .where(Department.is_active == True)
+    )
+
+    direct = db.select(
+        Employee.department_id.label('department_id'),
+        db.func.count(Employee.id).label('headcount'),
+        db.func.coalesce(db.func.sum(Employee.salary), 0).label('salary_total')
+    ).where(Employee.status == 'active').group_by(Employee.department_id).subquery('direct')
+
+    rolled = db.select(
+        closure.c.ancestor_id.label('department_id'),
+        db.func.coalesce(db.func.sum(direct.c.headcount), 0).label('headcount'),
+        db.func.coalesce(db.func.sum(direct.c.salary_total), 0).label('salary_total')
+    ).select_from(closure).outerjoin(
+        direct, direct.c.department_id == closure.c.descendant_id
+    ).group_by(closure.c.ancestor_id).subquery('rolled')
+
+    statement = db.select(
+        Department.id,
+        Department.name,
+        Department.code,
+        Department.parent_id,
+        Department.manager_id,
+        Department.budget,
+        db.func.coalesce(direct.c.headcount, 0).label('headcount'),
+        db.func.coalesce(direct.c.salary_total, 0).label('salary_total'),
+        rolled.c.headcount.label('total_headcount'),
+        rolled.c.salary_total.label('total_salary')
+    ).join(
+        rolled, rolled.c.department_id == Department.id
+    ).outerjoin(
+        direct, direct.c.department_id == Department.id
+    ).order_by(Department.name)
+
+    nodes = {}
+    for row in db.session.execute(statement):
+        nodes[row.id] = {
+            'id': row.id,
+            'name': row.name,
+            'code': row.code,
+            'parent_id': row.parent_id,
+            'manager_id': row.manager_id,
+            'budget': row.budget,
+            'headcount': row.headcount,
+            'salary_total': float(row.salary_total or 0),
+            'total_headcount': row.total_headcount,
+            'total_salary': float(row.total_salary or 0),
+            'children': []
+        }
+
+    children = {}
+    for node in nodes.values():
+        if node['parent_id'] in nodes and node['parent_id'] != node['id']:
+            children.setdefault(node['parent_id'], []).append(node)
+
+    if root_id is not None:
+        roots = [nodes[root_id]] if root_id in nodes else []
+    else:
+        roots = [node for node in nodes.values() if node['parent_id'] not in nodes]
+
+    # ربط الأبناء انطلاقاً من الجذور مع تجاهل أي حلقة
+    visited = set()
+    pending = list(roots)
+    while pending:
+        node = pending.pop()
+        visited.add(node['id'])
+        for child in children.get(node['id'], []):
+            if child['id'] not in visited:
+                node['children'].append(child)
+                pending.append(child)
+
+    return roots
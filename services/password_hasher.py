@@ -0,0 +1,115 @@
+"""
+تشفير كلمات المرور والتحقق منها خارج خيوط الطلبات
+
+- bcrypt عمل حسابي ثقيل، لذلك يتم تنفيذه في مجمع عمليات محدود الحجم
+- عند امتلاء المجمع يُرفض الطلب فوراً (PasswordHasherBusy) بدلاً من تكديس الطلبات
+- كلفة bcrypt قابلة للضبط (BCRYPT_LOG_ROUNDS)، وعند نجاح الدخول بتشفير
+  بكلفة مختلفة يُعاد التشفير بالكلفة الحالية في نفس الاستدعاء
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask import current_app, has_app_context
+
+from utils.processes import pool_context
+
+DEFAULT_ROUNDS = 12
+
+
+class PasswordHasherBusy(Exception):
+    """مجمع التشفير ممتلئ أو غير متاح حالياً"""
+    pass
+
+
+def _encode(password):
+    # bcrypt يتجاهل ما بعد 72 بايت (الإصدارات الحديثة ترفضه بدلاً من اقتطاعه)
+    return password.encode('utf-8')[:72]
+
+
+def hash_rounds(password_hash):
+    """كلفة bcrypt المستخدمة في تشفير موجود ($2b$12$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password_hash, password, rounds):
+    """يعيد (صحة كلمة المرور، تشفير جديد إذا اختلفت الكلفة أو None)"""
+    try:
+        valid = bcrypt.checkpw(_encode(password), password_hash.encode('utf-8'))
+    except ValueError:
+        return False, None
+    if valid and hash_rounds(password_hash) != rounds:
+        return True, _hash(password, rounds)
+    return valid, None
+
+
+def _config(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+
+class PasswordHasher:
+    """مجمع عمليات مشترك لكل عملية مع حد أقصى للطلبات المعلقة"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+
+    def _executor(self):
+        workers = _config('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        if workers <= 0:
+            return None, None
+
+        with self._lock:
+            # بعد fork (مثلاً gunicorn --preload) لا يصلح مجمع العملية الأم
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+                self._pool_pid = os.getpid()
+                pending = workers * _config('PASSWORD_HASH_QUEUE_FACTOR', 4)
+                self._slots = threading.BoundedSemaphore(pending)
+            return self._pool, self._slots
+
+    def _run(self, function, *args):
+        pool, slots = self._executor()
+        if pool is None:
+            return function(*args)
+
+        if not slots.acquire(timeout=_config('PASSWORD_HASH_WAIT', 2)):
+            raise PasswordHasherBusy('خدمة التحقق من كلمات المرور مشغولة')
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            self.shutdown()
+            raise PasswordHasherBusy('خدمة التحقق من كلمات المرور غير متاحة مؤقتاً')
+        finally:
+            slots.release()
+
+    def hash_password(self, password):
+        """تشفير كلمة مرور بالكلفة الحالية"""
+        return self._run(_hash, password, _config('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS))
+
+    def verify(self, password_hash, password):
+        """التحقق من كلمة المرور، يعيد (صحيحة، تشفير جديد أو None)"""
+        return self._run(_verify, password_hash, password, _config('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS))
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,196 @@
+"""
+توليد رواتب شهر كامل لكل الموظفين النشطين
+
+- الراتب الأساسي من Employee.salary، والعمل الإضافي من ساعات الحضور التي تزيد
+  عن ATTENDANCE_STANDARD_HOURS في اليوم، وأيام الإجازات غير المدفوعة من LeaveRequest
+  (استعلام واحد لكل منها للشهر كاملاً)
+- الحساب يتم على لقطة المدخلات في services.payroll_executor (شريحة لكل إدارة،
+  داخل العملية افتراضياً أو على مجمع عمليات حسب PAYROLL_WORKERS)
+- الإدخال بالجملة INSERT ... ON CONFLICT DO NOTHING على (employee_id, year, month)،
+  فإعادة التشغيل لا تكرر رواتب من سبق توليد راتبه
+- سجل PayrollRun يُلتزم أولاً بحالة running في معاملة قصيرة، ثم تُحدَّث عداداته بعد
+  كل دفعة في معاملة مستقلة فيراها GET /api/payroll/runs/<id> أثناء التنفيذ
+  (عدا SQLite: كاتب واحد فقط، فتبقى العدادات صفراً حتى الانتهاء)
+- الرواتب وملخص تكلفة الإدارات للشهر في معاملة واحدة (الاستدعاء يتولى commit)،
+  وعند الفشل يُلغى ما أُدخل ويُعلَّم التشغيل failed
+"""
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+from config.database import db
+from models.attendance import Attendance
+from models.employee import Employee
+from models.leave import LeaveRequest
+from models.payroll import Payroll, PayrollRun
+from services.attendance_rollup import month_bounds
+from services.payroll_executor import compute_payroll, freeze
+from services.payroll_rollup import refresh_rollups
+from utils.sql import insert_ignore
+
+
+class PayrollRunError(ValueError):
+    """مدخلات تشغيل الرواتب غير صالحة"""
+
+
+def _active_employees():
+    """(المعرفات، الإدارات، الرواتب) للموظفين النشطين مرتبين حسب الرقم"""
+    rows = db.session.connection().execute(
+        db.select(Employee.id, Employee.department_id, Employee.salary).where(
+            Employee.status == 'active',
+            Employee.salary.is_not(None)
+        ).order_by(Employee.id)
+    ).all()
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    departments = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    salaries = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    return ids, departments, salaries
+
+
+def _per_employee(ids, employees, values):
+    """توزيع قيم (موظف، قيمة) على ترتيب ids مع جمع المكرر وتجاهل غير النشطين"""
+    result = np.zeros(len(ids))
+    if len(employees) and len(ids):
+        position = np.clip(np.searchsorted(ids, employees), 0, len(ids) - 1)
+        known = ids[position] == employees
+        result += np.bincount(position[known], weights=values[known], minlength=len(ids))
+    return result
+
+
+def _overtime_hours(ids, start, end):
+    """مجموع ساعات العمل الإضافي في [start, end) لكل موظف بنفس ترتيب ids"""
+    standard = current_app.config.get('ATTENDANCE_STANDARD_HOURS', 8)
+    extra = db.case((Attendance.work_hours > standard, Attendance.work_hours - standard), else_=0)
+    rows = db.session.connection().execute(
+        db.select(Attendance.employee_id, db.func.sum(extra)).where(
+            Attendance.date >= start,
+            Attendance.date < end,
+            Attendance.work_hours.is_not(None)
+        ).group_by(Attendance.employee_id)
+    ).all()
+    employees = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    totals = np.fromiter((row[1] or 0 for row in rows), dtype=np.float64, count=len(rows))
+    return _per_employee(ids, employees, totals)
+
+
+def _unpaid_days(ids, start, end):
+    """أيام الإجازات المعتمدة غير المدفوعة (PAYROLL_UNPAID_LEAVE_TYPES) الواقعة داخل [start, end)"""
+    rows = db.session.connection().execute(
+        db.select(LeaveRequest.employee_id, LeaveRequest.start_date, LeaveRequest.end_date).where(
+            LeaveRequest.status == 'approved',
+            LeaveRequest.leave_type.in_(current_app.config.get('PAYROLL_UNPAID_LEAVE_TYPES', ('unpaid',))),
+            LeaveRequest.start_date < end,
+            LeaveRequest.end_date >= start
+        )
+    ).all()
+    employees = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    first = np.maximum(np.array([row[1] for row in rows], dtype='datetime64[D]'), np.datetime64(start, 'D'))
+    last = np.minimum(np.array([row[2] for row in rows], dtype='datetime64[D]'), np.datetime64(end, 'D') - 1)
+    days = np.maximum((last - first).astype(np.int64) + 1, 0).astype(np.float64)
+    return _per_employee(ids, employees, days)
+
+
+def load_inputs(year, month):
+    """لقطة مدخلات الشهر كمصفوفات للقراءة فقط (بترتيب رقم الموظف)"""
+    start, end = month_bounds(year, month)
+    ids, departments, salaries = _active_employees()
+    return freeze({
+        'employee_id': ids,
+        'department_id': departments,
+        'salary': salaries,
+        'overtime_hours': _overtime_hours(ids, start, end),
+        'unpaid_days': _unpaid_days(ids, start, end)
+    })
+
+
+def payroll_rules():
+    """قواعد الحساب من الإعدادات كقاموس عادي (يُمرر إلى عمليات الحساب)"""
+    config = current_app.config
+    return {
+        'monthly_hours': config.get('PAYROLL_MONTHLY_HOURS', 240),
+        'overtime_multiplier': config.get('PAYROLL_OVERTIME_MULTIPLIER', 1.5),
+        'month_days': config.get('PAYROLL_MONTH_DAYS', 30),
+        'allowances': list(config.get('PAYROLL_ALLOWANCE_RULES', []))
+    }
+
+
+def _publish_progress(run_id, **values):
+    """تحديث عدادات التشغيل في معاملة مستقلة عن معاملة الإدخال"""
+    with db.engine.begin() as connection:
+        connection.execute(db.update(PayrollRun).where(PayrollRun.id == run_id).values(**values))
+
+
+def generate_payroll(year, month, created_by=None, progress=None, chunk_size=5000):
+    """
+    توليد رواتب الشهر وإرجاع سجل PayrollRun
+
+    سجل التشغيل يُلتزم فوراً، أما الرواتب فتبقى بدون commit للاستدعاء.
+    progress(تمت معالجته، الإجمالي) تُستدعى بعد كل دفعة إدخال
+    """
+    if not 1 <= month <= 12:
+        raise PayrollRunError('الشهر يجب أن يكون بين 1 و 12')
+    if not 2000 <= year <= 2100:
+        raise PayrollRunError('السنة غير صالحة')
+
+    run = PayrollRun(year=year, month=month, status='running', created_by=created_by)
+    db.session.add(run)
+    db.session.commit()
+
+    try:
+        _generate(run, progress, chunk_size)
+    except Exception:
+        db.session.rollback()
+        run.status = 'failed'
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+        raise
+    return run
+
+
+def _generate(run, progress, chunk_size):
+    year, month = run.year, run.month
+    # SQLite يسمح بكاتب واحد: معاملة الإدخال تحجز القفل حتى commit
+    publish = db.engine.dialect.name != 'sqlite'
+
+    amounts = compute_payroll(
+        load_inputs(year, month), payroll_rules(), current_app.config.get('PAYROLL_WORKERS', 1)
+    )
+    ids = amounts.pop('employee_id')
+    total = len(ids)
+
+    statement = insert_ignore(Payroll, ['employee_id', 'year', 'month']).returning(Payroll.net_salary)
+    columns = list(amounts)
+    now = datetime.utcnow()
+    created = 0
+    total_net = 0.0
+    for begin in range(0, total, chunk_size):
+        chunk = slice(begin, begin + chunk_size)
+        values = [amounts[name][chunk].tolist() for name in columns]
+        params = [{
+            'employee_id': employee_id,
+            'year': year,
+            'month': month,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now,
+            **dict(zip(columns, row))
+        } for employee_id, *row in zip(ids[chunk].tolist(), *values)]
+        inserted = db.session.execute(statement, params).scalars().all()
+        created += len(inserted)
+        total_net += sum(inserted)
+        done = min(begin + chunk_size, total)
+        if publish:
+            _publish_progress(run.id, total_employees=total, created_count=created, skipped_count=done - created)
+        if progress:
+            progress(done, total)
+
+    if created:
+        refresh_rollups([(year, month)])
+
+    run.total_employees = total
+    run.created_count = created
+    run.skipped_count = total - created
+    run.total_net = round(total_net, 2)
+    run.status = 'completed'
+    run.finished_at = datetime.utcnow()
@@ -0,0 +1,108 @@
+"""
+حساب الرواتب على مجمع عمليات مقسماً حسب الإدارات
+
+- المدخلات لقطة للقراءة فقط (مصفوفات NumPy) تُحمَّل مرة واحدة في العملية الرئيسية،
+  ثم تُقسم إلى شريحة لكل إدارة وتُحسب كل شريحة في عملية مستقلة
+- الدوال هنا لا تلمس قاعدة البيانات ولا سياق Flask (كل القواعد تُمرر كقاموس)
+- الدمج يرتب النتائج حسب رقم الموظف، فالنتيجة واحدة مهما كان عدد العمليات أو ترتيب انتهائها
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.processes import pool_context
+
+INPUT_COLUMNS = ('employee_id', 'department_id', 'salary', 'overtime_hours', 'unpaid_days')
+OUTPUT_COLUMNS = (
+    'basic_salary', 'allowances', 'bonuses', 'deductions', 'overtime_hours', 'overtime_amount', 'net_salary'
+)
+
+
+def freeze(inputs):
+    """جعل مصفوفات اللقطة للقراءة فقط"""
+    for values in inputs.values():
+        values.setflags(write=False)
+    return inputs
+
+
+def compute_shard(inputs, rules):
+    """
+    مبالغ الرواتب لشريحة موظفين (نفس معادلة Payroll.calculate_net_salary)
+
+    rules: monthly_hours, overtime_multiplier, month_days, allowances
+    كل بدل: {'rate': نسبة من الأساسي} أو {'amount': مبلغ ثابت}، مع department_id اختياري
+    """
+    salaries = inputs['salary']
+    departments = inputs['department_id']
+    size = len(salaries)
+
+    hourly = salaries / rules['monthly_hours']
+    overtime_hours = np.round(inputs['overtime_hours'], 2)
+    overtime_amount = np.round(overtime_hours * hourly * rules['overtime_multiplier'], 2)
+
+    allowances = np.zeros(size)
+    for rule in rules['allowances']:
+        value = salaries * rule.get('rate', 0) + rule.get('amount', 0)
+        if rule.get('department_id') is not None:
+            value = np.where(departments == rule['department_id'], value, 0)
+        allowances += value
+    allowances = np.round(allowances, 2)
+
+    # خصم أيام الإجازة غير المدفوعة بالأجر اليومي (الراتب / أيام الشهر)
+    unpaid_days = np.minimum(inputs['unpaid_days'], rules['month_days'])
+    deductions = np.round(salaries / rules['month_days'] * unpaid_days, 2)
+
+    bonuses = np.zeros(size)
+    net = np.round(salaries + allowances + bonuses + overtime_amount - deductions, 2)
+    return {
+        'employee_id': inputs['employee_id'],
+        'basic_salary': salaries,
+        'allowances': allowances,
+        'bonuses': bonuses,
+        'deductions': deductions,
+        'overtime_hours': overtime_hours,
+        'overtime_amount': overtime_amount,
+        'net_salary': net
+    }
+
+
+def department_shards(inputs):
+    """شريحة لكل إدارة (الأكبر أولاً حتى لا تتأخر آخر شريحة كبيرة)"""
+    departments, inverse, counts = np.unique(
+        inputs['department_id'], return_inverse=True, return_counts=True
+    )
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    shards = [
+        {name: inputs[name][order[bounds[i]:bounds[i + 1]]] for name in INPUT_COLUMNS}
+        for i in range(len(departments))
+    ]
+    shards.sort(key=lambda shard: (-len(shard['employee_id']), int(shard['department_id'][0])))
+    return shards
+
+
+def merge(results):
+    """دمج نتائج الشرائح مرتبة حسب رقم الموظف"""
+    if not results:
+        empty = {name: np.zeros(0) for name in OUTPUT_COLUMNS}
+        return {'employee_id': np.zeros(0, dtype=np.int64), **empty}
+    merged = {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+    order = np.argsort(merged['employee_id'], kind='stable')
+    return {name: values[order] for name, values in merged.items()}
+
+
+def compute_payroll(inputs, rules, workers=0):
+    """
+    حساب رواتب كل الموظفين في اللقطة
+
+    workers ≤ 1 (الافتراضي) يحسب في العملية الحالية، وإلا تُوزع شرائح الإدارات على مجمع
+    عمليات - مفيد فقط مع قواعد بدلات كثيرة وأنوية متعددة، فتكلفة إنشاء العمليات أكبر
+    من الحساب المتجه نفسه في الحالات المعتادة
+    """
+    shards = department_shards(inputs)
+    if workers <= 1 or len(shards) <= 1:
+        return merge([compute_shard(shard, rules) for shard in shards])
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=pool_context()) as pool:
+        results = list(pool.map(compute_shard, shards, [rules] * len(shards)))
+    return merge(results)
@@ -0,0 +1,244 @@
+"""
+ملفات يوم صرف الرواتب: ملف التحويل البنكي وقسائم الرواتب
+
+- كل الملفات تُبنى متدفقة من مؤشر من جهة الخادم على Payroll + Employee (دفعات yield_per)،
+  فالذاكرة ثابتة مهما كان عدد الموظفين
+- ملف البنك CSV أو بعرض ثابت (سجل لكل موظف ثم سجل ختامي بالعدد والإجمالي)
+- قسائم الرواتب HTML داخل ZIP يكتبه zipfile مباشرة إلى التدفق (بدون seek)،
+  والعرض داخل العملية افتراضياً أو على مجمع عمليات (PAYSLIP_RENDER_WORKERS)
+  بنافذة محدودة من الدفعات مع الحفاظ على الترتيب
+"""
+import html
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config.database import db
+from models.bank_account import EmployeeBankAccount
+from models.department import Department
+from models.employee import Employee
+from models.payroll import Payroll
+from utils.processes import pool_context
+
+BANK_FILE_HEADER = ('employee_number', 'account_name', 'iban', 'bank_name', 'amount', 'currency', 'reference')
+
+# عرض حقول سجل التفاصيل في الملف ذي العرض الثابت
+FIXED_WIDTHS = (('iban', 34), ('amount', 15), ('currency', 3), ('account_name', 35), ('reference', 20))
+
+PAYSLIP_LINES = (
+    ('basic_salary', 'الراتب الأساسي'),
+    ('allowances', 'البدلات'),
+    ('bonuses', 'المكافآت'),
+    ('overtime_amount', 'العمل الإضافي'),
+    ('deductions', 'الخصومات')
+)
+
+
+def normalize_iban(value):
+    """IBAN بدون مسافات وبأحرف كبيرة (ASCII فقط)، أو None إذا فشل التحقق (الصيغة ورقم التحقق mod 97)"""
+    iban = str(value or '').replace(' ', '').upper()
+    # isalnum/isdigit تقبل أحرفاً وأرقاماً غير لاتينية
+    if not iban.isascii() or not 15 <= len(iban) <= 34 or not iban.isalnum() or not iban[:2].isalpha() or not iban[2:4].isdigit():
+        return None
+    digits = ''.join(str(int(char, 36)) for char in iban[4:] + iban[:4])
+    return iban if int(digits) % 97 == 1 else None
+
+
+def payroll_statement(year, month, department_id=None):
+    """رواتب الشهر (غير الملغاة) مع بيانات الموظف وحسابه البنكي مرتبة حسب الموظف"""
+    statement = db.select(
+        Payroll.employee_id,
+        Employee.employee_number,
+        Employee.first_name,
+        Employee.last_name,
+        Department.name.label('department_name'),
+        EmployeeBankAccount.iban,
+        EmployeeBankAccount.bank_name,
+        EmployeeBankAccount.account_name,
+        Payroll.year,
+        Payroll.month,
+        Payroll.basic_salary,
+        Payroll.allowances,
+        Payroll.bonuses,
+        Payroll.deductions,
+        Payroll.overtime_hours,
+        Payroll.overtime_amount,
+        Payroll.net_salary
+    ).join(
+        Employee, Employee.id == Payroll.employee_id
+    ).outerjoin(
+        Department, Department.id == Employee.department_id
+    ).outerjoin(
+        EmployeeBankAccount, EmployeeBankAccount.employee_id == Payroll.employee_id
+    ).where(
+        Payroll.year == year,
+        Payroll.month == month,
+        Payroll.status != 'cancelled'
+    ).order_by(Payroll.employee_id)
+    if department_id is not None:
+        statement = statement.where(Employee.department_id == department_id)
+    return statement
+
+
+def payroll_batches(statement, size=1000):
+    """دفعات قواميس من مؤشر من جهة الخادم"""
+    result = db.session.execute(statement, execution_options={'yield_per': size})
+    for partition in result.partitions():
+        yield [dict(row._mapping) for row in partition]
+
+
+def missing_bank_accounts(year, month, limit=100):
+    """(العدد، أرقام أول limit موظف) ممن لهم صافٍ موجب في الشهر بدون حساب بنكي"""
+    statement = payroll_statement(year, month).where(
+        Payroll.net_salary > 0,
+        EmployeeBankAccount.employee_id.is_(None)
+    )
+    count = db.session.scalar(
+        db.select(db.func.count()).select_from(statement.order_by(None).subquery())
+    )
+    numbers = db.session.scalars(
+        statement.with_only_columns(Employee.employee_number).limit(limit)
+    ).all() if count else []
+    return count, numbers
+
+
+def _transfers(batches, year, month, currency):
+    """صفوف التحويل (الصافي الموجب ولهم حساب بنكي فقط، بالمبلغ لأقرب وحدة صغرى)"""
+    for batch in batches:
+        rows = []
+        for row in batch:
+            cents = int(round((row['net_salary'] or 0) * 100))
+            # من ليس لهم حساب يُبلَّغ عنهم قبل التصدير (missing_bank_accounts) ولا يدخلون الملف
+            if cents <= 0 or not row['iban']:
+                continue
+            rows.append({
+                'employee_number': row['employee_number'],
+                'account_name': row['account_name'] or f"{row['first_name']} {row['last_name']}",
+                'iban': row['iban'].replace(' ', '').upper(),
+                'bank_name': row['bank_name'] or '',
+                'cents': cents,
+                'currency': currency,
+                'reference': f"SAL{year}{month:02d}-{row['employee_number']}"
+            })
+        yield rows
+
+
+def bank_csv_batches(batches, year, month, currency):
+    """صفوف ملف البنك بصيغة CSV (تُمرر إلى utils.streaming.csv_lines مع BANK_FILE_HEADER)"""
+    for rows in _transfers(batches, year, month, currency):
+        yield [
+            [row[name] if name != 'amount' else f"{row['cents'] / 100:.2f}" for name in BANK_FILE_HEADER]
+            for row in rows
+        ]
+
+
+def _fixed(value, width):
+    """حقل بعرض ثابت بالبايت (UTF-8) - الاقتطاع لا يقسم حرفاً متعدد البايتات"""
+    text = str(value).encode('utf-8')[:width].decode('utf-8', errors='ignore')
+    return text + ' ' * (width - len(text.encode('utf-8')))
+
+
+def bank_fixed_width_lines(batches, year, month, currency):
+    """
+    ملف البنك بعرض ثابت (CRLF بين السجلات، العرض بالبايت بعد ترميز UTF-8)
+
+    D + IBAN(34) + المبلغ بالوحدة الصغرى(15، أصفار بادئة) + العملة(3) + الاسم(35) + المرجع(20)
+    T + عدد السجلات(10) + الإجمالي بالوحدة الصغرى(18)
+    """
+    count = 0
+    total = 0
+    for rows in _transfers(batches, year, month, currency):
+        lines = []
+        for row in rows:
+            fields = dict(row, amount=str(row['cents']).zfill(15))
+            lines.append('D' + ''.join(_fixed(fields[name], width) for name, width in FIXED_WIDTHS) + '\r\n')
+            count += 1
+            total += row['cents']
+        if lines:
+            yield ''.join(lines)
+    yield f'T{str(count).zfill(10)}{str(total).zfill(18)}\r\n'
+
+
+def _money(value):
+    return f'{value or 0:,.2f}'
+
+
+def render_payslip(row):
+    """قسيمة راتب واحدة كصفحة HTML مستقلة"""
+    name = html.escape(f"{row['first_name']} {row['last_name']}")
+    lines = ''.join(
+        f'<tr><td>{label}</td><td>{_money(row[key])}</td></tr>' for key, label in PAYSLIP_LINES
+    )
+    return (
+        '<!DOCTYPE html><html lang="ar" dir="rtl"><head><meta charset="utf-8">'
+        f'<title>قسيمة راتب {row["month"]:02d}/{row["year"]}</title></head><body>'
+        f'<h1>قسيمة راتب {row["month"]:02d}/{row["year"]}</h1>'
+        f'<p>الموظف: {name} ({html.escape(str(row["employee_number"]))})</p>'
+        f'<p>الإدارة: {html.escape(row["department_name"] or "-")}</p>'
+        f'<table>{lines}'
+        f'<tr><td>ساعات العمل الإضافي</td><td>{row["overtime_hours"] or 0:g}</td></tr>'
+        f'<tr><th>الصافي</th><th>{_money(row["net_salary"])}</th></tr></table>'
+        '</body></html>'
+    )
+
+
+def render_payslip_batch(rows):
+    """[(اسم الملف، المحتوى)] لدفعة - تُنفذ في عمليات المجمع"""
+    return [
+        (
+            f"{row['employee_number']}-{row['year']}-{row['month']:02d}.html",
+            render_payslip(row).encode('utf-8')
+        ) for row in rows
+    ]
+
+
+def _rendered(batches, workers):
+    """عرض الدفعات بالترتيب، مع حد أقصى workers × 2 دفعة قيد التنفيذ"""
+    if workers <= 1:
+        for batch in batches:
+            yield render_payslip_batch(batch)
+        return
+
+    # بدون fork: الطلب يحمل مؤشر yield_per مفتوحاً على اتصال الجلسة
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+    pending = deque()
+    try:
+        for batch in batches:
+            pending.append(pool.submit(render_payslip_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # يشمل انقطاع العميل أثناء التنزيل
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _StreamSink:
+    """ملف للكتابة فقط (بدون seek/tell) يجمع ما يكتبه zipfile حتى يُرسل"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def payslip_zip(batches, workers=1):
+    """ZIP متدفق لقسائم الرواتب: جزء لكل دفعة ثم الفهرس المركزي في النهاية"""
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for rendered in _rendered(batches, workers):
+            for name, content in rendered:
+                archive.writestr(name, content)
+            yield sink.drain()
+    yield sink.drain()
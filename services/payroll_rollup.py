@@ -0,0 +1,134 @@
+"""
+ملخص تكلفة الرواتب لكل (إدارة، شهر)
+
+- يُعاد حساب الشهر المتأثر من جدول الرواتب داخل نفس معاملة الكتابة
+  (تجميع واحد على فهرس year, month)، والرواتب الملغاة لا تُحتسب
+- الإدارة هي الإدارة الحالية للموظف؛ بعد نقل موظفين بين الإدارات يعيد
+  أمر flask rebuild-payroll-rollups بناء الملخص بالكامل
+- تقارير الميزانية والاتجاهات تقرأ الملخص فقط (صف لكل إدارة في الشهر)
+"""
+from datetime import datetime
+
+from flask import current_app
+
+from config.database import db
+from models.department import Department
+from models.employee import Employee
+from models.payroll import Payroll
+from models.payroll_rollup import PayrollDepartmentRollup
+from utils.sql import dialect_insert
+
+ROLLUP_COLUMNS = (
+    'headcount', 'basic_salary', 'allowances', 'bonuses', 'deductions',
+    'overtime_hours', 'overtime_amount', 'net_salary'
+)
+
+
+def _sum(column):
+    return db.func.coalesce(db.func.sum(column), 0)
+
+
+def _aggregate(where):
+    department = db.func.coalesce(Employee.department_id, 0)
+    return db.select(
+        department.label('department_id'),
+        Payroll.year,
+        Payroll.month,
+        db.func.count(Payroll.id).label('headcount'),
+        *[_sum(getattr(Payroll, column)).label(column) for column in ROLLUP_COLUMNS[1:]]
+    ).join(
+        Employee, Employee.id == Payroll.employee_id
+    ).where(
+        Payroll.status != 'cancelled',
+        *where
+    ).group_by(department, Payroll.year, Payroll.month)
+
+
+def _upsert(select, now):
+    columns = ('department_id', 'year', 'month') + ROLLUP_COLUMNS + ('updated_at',)
+    statement = dialect_insert(PayrollDepartmentRollup)
+    statement = statement.from_select(
+        columns, select.add_columns(db.literal(now, db.DateTime).label('updated_at'))
+    ).on_conflict_do_update(
+        index_elements=['department_id', 'year', 'month'],
+        set_={column: statement.excluded[column] for column in ROLLUP_COLUMNS + ('updated_at',)}
+    )
+    db.session.execute(statement)
+
+
+def refresh_rollups(periods):
+    """إعادة حساب ملخصات مجموعة أشهر (year, month) - عبارتان لكل شهر"""
+    now = datetime.utcnow()
+    for year, month in set(periods):
+        # حذف ثم إدخال حتى لا يبقى ملخص لإدارة لم يعد لها رواتب في الشهر
+        db.session.execute(db.delete(PayrollDepartmentRollup).where(
+            PayrollDepartmentRollup.year == year,
+            PayrollDepartmentRollup.month == month
+        ))
+        _upsert(_aggregate((Payroll.year == year, Payroll.month == month)), now)
+
+
+def rebuild_rollups():
+    """إعادة بناء جميع الملخصات من جدول الرواتب، يعيد عدد الملخصات"""
+    db.session.execute(db.delete(PayrollDepartmentRollup))
+    _upsert(_aggregate(()), datetime.utcnow())
+    return db.session.scalar(db.select(db.func.count()).select_from(PayrollDepartmentRollup))
+
+
+def _period_index(year, month):
+    return year * 12 + month - 1
+
+
+def budget_utilization(start, end, department_id=None):
+    """
+    الميزانية مقابل صافي الرواتب الفعلي لكل إدارة وشهر في [start, end]
+
+    start و end على شكل (year, month). ميزانية الشهر = Department.budget / DEPARTMENT_BUDGET_MONTHS
+    """
+    budget_months = current_app.config.get('DEPARTMENT_BUDGET_MONTHS', 12)
+    rollup = PayrollDepartmentRollup
+    period = rollup.year * 12 + rollup.month - 1
+
+    statement = db.select(
+        rollup.department_id,
+        rollup.year,
+        rollup.month,
+        *[getattr(rollup, column) for column in ROLLUP_COLUMNS],
+        Department.name.label('department_name'),
+        Department.budget
+    ).outerjoin(
+        Department, Department.id == rollup.department_id
+    ).where(
+        rollup.year.between(start[0], end[0]),
+        period.between(_period_index(*start), _period_index(*end))
+    ).order_by(rollup.department_id, rollup.year, rollup.month)
+    if department_id is not None:
+        statement = statement.where(rollup.department_id == department_id)
+
+    departments = {}
+    for row in db.session.execute(statement):
+        data = dict(row._mapping)
+        department = data.pop('department_id')
+        name = data.pop('department_name')
+        monthly_budget = round((data.pop('budget') or 0) / budget_months, 2)
+        item = departments.setdefault(department, {
+            'department_id': department or None,
+            'department_name': name,
+            'monthly_budget': monthly_budget,
+            'net_salary': 0.0,
+            'budget': 0.0,
+            'months': []
+        })
+        data['budget'] = monthly_budget
+        data['utilization'] = round(data['net_salary'] / monthly_budget, 4) if monthly_budget else None
+        item['months'].append(data)
+        item['net_salary'] += data['net_salary']
+        item['budget'] += monthly_budget
+
+    result = []
+    for item in departments.values():
+        item['net_salary'] = round(item['net_salary'], 2)
+        item['budget'] = round(item['budget'], 2)
+        item['utilization'] = round(item['net_salary'] / item['budget'], 4) if item['budget'] else None
+        result.append(item)
+    return result
@@ -0,0 +1,271 @@
+"""
+خرائط الحضور اليومية (bitmap لكل يوم، البت رقم N = الموظف رقم N)
+
+- كل عملية تحتفظ بالأيام المطلوبة في الذاكرة، وتُبنى من جدول الحضور مرة واحدة
+  أو تُحمَّل من لقطات مضغوطة (presence_snapshots) يكتبها أمر flask rebuild-presence
+- التغييرات (كل بصمة تحدّث attendance.updated_at) تُطبق تدريجياً عبر استعلام
+  على updated_at كل PRESENCE_REFRESH ثانية، وفوراً في العملية التي سجلت البصمة
+- العد والقوائم لكل يوم/إدارة تتم بعمليات AND / OR / NOT على أعداد Python الصحيحة
+"""
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from config.database import db
+from models.attendance import Attendance
+from models.employee import Employee
+from models.presence_snapshot import PresenceSnapshot
+from utils.cache import stats_cache
+
+PRESENT_STATUSES = ('present', 'late')
+MAX_RANGE_DAYS = 366
+
+
+def late_threshold():
+    """وقت بداية الدوام + فترة السماح (ATTENDANCE_SHIFT_START / ATTENDANCE_LATE_GRACE_MINUTES)"""
+    start = datetime.strptime(current_app.config.get('ATTENDANCE_SHIFT_START', '08:00'), '%H:%M')
+    grace = current_app.config.get('ATTENDANCE_LATE_GRACE_MINUTES', 15)
+    return (start + timedelta(minutes=grace)).time()
+
+
+def is_late(status, check_in, threshold):
+    if status == 'late':
+        return True
+    return status == 'present' and check_in is not None and check_in > threshold
+
+
+class Bitmap:
+    """مجموعة أرقام كمصفوفة بايتات قابلة للتعديل O(1)، تتحول إلى int للعمليات المنطقية"""
+    __slots__ = ('data',)
+
+    def __init__(self, data=b''):
+        self.data = bytearray(data)
+
+    def set(self, position, value=True):
+        index = position >> 3
+        if index >= len(self.data):
+            if not value:
+                return
+            self.data.extend(bytes(index - len(self.data) + 1))
+        if value:
+            self.data[index] |= 1 << (position & 7)
+        else:
+            self.data[index] &= ~(1 << (position & 7)) & 0xFF
+
+    def to_int(self):
+        return int.from_bytes(self.data, 'little')
+
+    def compress(self):
+        return zlib.compress(bytes(self.data))
+
+    @classmethod
+    def decompress(cls, blob):
+        return cls(zlib.decompress(blob))
+
+
+def bit_ids(bits):
+    """أرقام البتات المفعلة مرتبة تصاعدياً"""
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            ids.append(index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+class DayPresence:
+    __slots__ = ('present', 'late', 'on_leave')
+
+    def __init__(self, present=None, late=None, on_leave=None):
+        self.present = present or Bitmap()
+        self.late = late or Bitmap()
+        self.on_leave = on_leave or Bitmap()
+
+    def apply(self, employee_id, status, check_in, threshold):
+        self.present.set(employee_id, status in PRESENT_STATUSES)
+        self.late.set(employee_id, is_late(status, check_in, threshold))
+        self.on_leave.set(employee_id, status == 'leave')
+
+
+def employee_masks():
+    """خرائط الموظفين النشطين (الكل ولكل إدارة) - تُبطل مع أي تعديل على الموظفين"""
+    def compute():
+        active = Bitmap()
+        departments = {}
+        rows = db.session.execute(
+            db.select(Employee.id, Employee.department_id).where(Employee.status == 'active')
+        )
+        for employee_id, department_id in rows:
+            active.set(employee_id)
+            departments.setdefault(department_id, Bitmap()).set(employee_id)
+        return {
+            'active': active.to_int(),
+            'departments': {key: bitmap.to_int() for key, bitmap in departments.items()}
+        }
+    return stats_cache.get_or_compute('presence_masks', compute)
+
+
+class PresenceIndex:
+    """خرائط الحضور المحملة في هذه العملية"""
+
+    # إعادة قراءة نافذة متداخلة حتى لا تفوت تعديلات معاملات التزمت متأخرة
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._days = {}
+        self._watermark = None
+        self._next_refresh = 0
+
+    def expire(self):
+        """فرض تطبيق التغييرات عند القراءة التالية (بعد تسجيل بصمة في هذه العملية)"""
+        self._next_refresh = 0
+
+    def _apply_rows(self, rows):
+        threshold = late_threshold()
+        for employee_id, day, status, check_in in rows:
+            presence = self._days.get(day)
+            if presence is not None:
+                presence.apply(employee_id, status, check_in, threshold)
+
+    def _changes(self, since, days=None):
+        statement = db.select(
+            Attendance.employee_id, Attendance.date, Attendance.status, Attendance.check_in
+        ).where(Attendance.updated_at >= since - self.OVERLAP)
+        if days:
+            statement = statement.where(Attendance.date.between(min(days), max(days)))
+        return db.session.execute(statement)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh or self._watermark is None:
+            return
+        started = datetime.utcnow()
+        self._apply_rows(self._changes(self._watermark, self._days.keys()))
+        self._watermark = started
+        self._next_refresh = now + current_app.config.get('PRESENCE_REFRESH', 2)
+
+    def _load(self, days):
+        """تحميل الأيام الناقصة من اللقطات أو بناؤها من جدول الحضور"""
+        missing = [day for day in days if day not in self._days]
+        if not missing:
+            return
+        if len(self._days) + len(missing) > current_app.config.get('PRESENCE_MAX_DAYS', 1100):
+            self._days.clear()
+            self._watermark = None
+            missing = list(days)
+
+        started = datetime.utcnow()
+        snapshots = db.session.execute(
+            db.select(PresenceSnapshot).where(PresenceSnapshot.date.in_(missing))
+        ).scalars().all()
+        oldest = None
+        for snapshot in snapshots:
+            self._days[snapshot.date] = DayPresence(
+                Bitmap.decompress(snapshot.present),
+                Bitmap.decompress(snapshot.late),
+                Bitmap.decompress(snapshot.on_leave)
+            )
+            oldest = min(oldest or snapshot.built_at, snapshot.built_at)
+        if oldest is not None:
+            # ما تغير بعد أخذ اللقطات
+            self._apply_rows(self._changes(oldest, [s.date for s in snapshots]))
+
+        to_build = [day for day in missing if day not in self._days]
+        if to_build:
+            for day in to_build:
+                self._days[day] = DayPresence()
+            self._apply_rows(db.session.execute(
+                db.select(
+                    Attendance.employee_id, Attendance.date, Attendance.status, Attendance.check_in
+                ).where(Attendance.date.in_(to_build))
+            ))
+
+        if self._watermark is None or started < self._watermark:
+            self._watermark = started
+
+    def _persist(self, days):
+        """حفظ لقطات مضغوطة لأيام محددة (تُحمَّل بدلاً من البناء عند بدء العمليات)"""
+        rows = [{
+            'date': day,
+            'present': self._days[day].present.compress(),
+            'late': self._days[day].late.compress(),
+            'on_leave': self._days[day].on_leave.compress(),
+            'built_at': datetime.utcnow()
+        } for day in days]
+        db.session.execute(db.delete(PresenceSnapshot).where(PresenceSnapshot.date.in_(days)))
+        db.session.execute(db.insert(PresenceSnapshot), rows)
+
+    def rebuild(self, days):
+        """إعادة بناء أيام محددة من جدول الحضور وحفظ لقطاتها (بدون commit)"""
+        with self._lock:
+            for day in days:
+                self._days.pop(day, None)
+            self._load(days)
+            self._persist(days)
+
+    def bitmaps(self, days):
+        """{اليوم: (حاضر، متأخر، إجازة)} كأعداد صحيحة"""
+        with self._lock:
+            self._load(days)
+            self._refresh()
+            return {
+                day: (
+                    self._days[day].present.to_int(),
+                    self._days[day].late.to_int(),
+                    self._days[day].on_leave.to_int()
+                ) for day in days
+            }
+
+
+presence_index = PresenceIndex()
+
+
+def _scope(department_id):
+    masks = employee_masks()
+    if department_id is None:
+        return masks['active']
+    return masks['departments'].get(department_id, 0)
+
+
+def _summary(bits, scope, include_ids):
+    present, late, on_leave = bits
+    groups = {
+        'present': present & scope,
+        'late': late & scope,
+        'on_leave': on_leave & scope
+    }
+    groups['absent'] = scope & ~(groups['present'] | groups['on_leave'])
+
+    summary = {'total': scope.bit_count()}
+    for name, value in groups.items():
+        summary[name] = value.bit_count()
+        if include_ids:
+            summary[f'{name}_ids'] = bit_ids(value)
+    return summary
+
+
+def day_presence(day, department_id=None, include_ids=False):
+    """عدد (وقوائم) الحاضرين والغائبين والمتأخرين والمجازين ليوم"""
+    bits = presence_index.bitmaps([day])[day]
+    summary = _summary(bits, _scope(department_id), include_ids)
+    summary['date'] = day.isoformat()
+    return summary
+
+
+def range_presence(start, end, department_id=None):
+    """الأعداد لكل يوم في نطاق تاريخ"""
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    scope = _scope(department_id)
+    bitmaps = presence_index.bitmaps(days)
+    result = []
+    for day in days:
+        summary = _summary(bitmaps[day], scope, False)
+        summary['date'] = day.isoformat()
+        result.append(summary)
+    return result
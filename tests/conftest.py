@@ -0,0 +1,81 @@
+"""
+إعدادات pytest: التطبيق على قاعدة SQLite مؤقتة مع البيانات التجريبية
+
+python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # يجب ضبط المتغيرات قبل استيراد app (الإعدادات و init_db تُقرأ عند الاستيراد)
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'hr.db'}"
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_headers(app):
+    """ترويسة Authorization لمستخدم (admin@hrms.com افتراضياً)"""
+    from flask_jwt_extended import create_access_token
+    from models.user import User
+
+    def make(email='admin@hrms.com'):
+        with app.app_context():
+            user = User.query.filter_by(email=email).one()
+            token = create_access_token(identity=str(user.id))
+        return {'Authorization': f'Bearer {token}'}
+
+    return make
+
+
+@pytest.fixture
+def admin_headers(make_headers):
+    return make_headers()
+
+
+class QueryCounter:
+    """عدد عبارات SQL المنفذة فعلياً على المحرك داخل with"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(app):
+    from config.database import db
+
+    with app.app_context():
+        engine = db.engine
+    return lambda: QueryCounter(engine)
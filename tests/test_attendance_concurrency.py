@@ -0,0 +1,73 @@
+"""
+حضور وانصراف وبصمات متزامنة لنفس الموظف واليوم: سجل واحد دائماً (القيد الفريد + upsert)
+"""
+import threading
+from datetime import date, datetime, time
+
+from config.database import db
+from models.attendance import Attendance
+
+THREADS = 16
+
+
+def _parallel(app, call, count=THREADS):
+    """تنفيذ call(client, i) في خيوط تبدأ معاً، وإرجاع الردود بترتيب i"""
+    barrier = threading.Barrier(count)
+    responses = [None] * count
+
+    def worker(i):
+        client = app.test_client()
+        barrier.wait()
+        responses[i] = call(client, i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def _rows(app, employee_id, day):
+    with app.app_context():
+        return db.session.execute(
+            db.select(Attendance.check_in, Attendance.check_out, Attendance.work_hours).where(
+                Attendance.employee_id == employee_id,
+                Attendance.date == day
+            )
+        ).all()
+
+
+def test_parallel_check_in_and_check_out_create_one_record(app, admin_headers):
+    check_ins = _parallel(app, lambda client, i: client.post('/api/attendance/check-in', headers=admin_headers))
+    statuses = sorted(response.status_code for response in check_ins)
+    assert statuses == [201] + [400] * (THREADS - 1)
+
+    check_outs = _parallel(app, lambda client, i: client.post('/api/attendance/check-out', headers=admin_headers))
+    statuses = sorted(response.status_code for response in check_outs)
+    assert statuses == [200] + [400] * (THREADS - 1)
+
+    # المستخدم admin@hrms.com مرتبط بالموظف 1 في البيانات التجريبية
+    rows = _rows(app, 1, date.today())
+    assert len(rows) == 1
+    assert rows[0].check_out is not None
+
+
+def test_parallel_punch_batches_merge_into_one_record(app, admin_headers):
+    day = date(2025, 3, 10)
+
+    def punches(client, i):
+        batch = [
+            {'employee_id': 2, 'direction': 'in', 'timestamp': datetime.combine(day, time(8, i)).isoformat()},
+            {'employee_id': 2, 'direction': 'out', 'timestamp': datetime.combine(day, time(16, i)).isoformat()}
+        ]
+        return client.post('/api/attendance/punches', headers=admin_headers, json={'punches': batch})
+
+    responses = _parallel(app, punches)
+    assert all(response.status_code == 200 for response in responses)
+
+    rows = _rows(app, 2, day)
+    assert len(rows) == 1
+    assert rows[0].check_in == time(8, 0)
+    assert rows[0].check_out == time(16, THREADS - 1)
+    assert rows[0].work_hours == round(8 + (THREADS - 1) / 60, 2)
@@ -0,0 +1,29 @@
+"""
+توكن تسجيل الدخول الحقيقي: الوصول للمسارات المحمية ثم إلغاؤه عند تسجيل الخروج
+"""
+from models.revoked_token import RevokedToken
+
+
+def _login(client):
+    response = client.post('/api/auth/login', json={'email': 'admin@hrms.com', 'password': 'admin123'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['data']['token']}"}
+
+
+def test_login_token_is_accepted_then_revoked_on_logout(app, client):
+    headers = _login(client)
+
+    assert client.get('/api/employees/', headers=headers).status_code == 200
+    me = client.get('/api/auth/me', headers=headers)
+    assert me.status_code == 200
+    assert me.get_json()['data']['email'] == 'admin@hrms.com'
+
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/employees/', headers=headers).status_code == 401
+
+    with app.app_context():
+        revoked = RevokedToken.query.order_by(RevokedToken.id.desc()).first()
+        assert revoked.user_id == me.get_json()['data']['id']
+
+    # توكن جديد لنفس المستخدم غير متأثر
+    assert client.get('/api/employees/', headers=_login(client)).status_code == 200
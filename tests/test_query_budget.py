@@ -0,0 +1,82 @@
+"""
+عدد الاستعلامات في قائمة الموظفين وتفاصيلهم ثابت مهما كان حجم الصفحة (بدون N+1)
+"""
+from datetime import date
+
+import pytest
+
+from config.database import db
+from models.department import Department
+from models.employee import Employee
+from models.job_title import JobTitle
+
+EMPLOYEES = 60
+
+# العدد + الصفحة + جيل ذاكرة الإحصائيات، مع هامش لاستعلامات المصادقة عند انتهاء ذاكرتها
+LIST_BUDGET = 5
+DETAIL_BUDGET = 4
+
+
+@pytest.fixture(scope='module')
+def employees(app):
+    """موظفون بإدارات ومسميات ومدراء مختلفين حتى لا تخفي خريطة الهوية أي تحميل كسول"""
+    with app.app_context():
+        departments = [
+            Department(name=f'إدارة اختبار {i}', code=f'QB{i}') for i in range(EMPLOYEES)
+        ]
+        titles = [JobTitle(title=f'مسمى اختبار {i}', code=f'QBT{i}') for i in range(EMPLOYEES)]
+        db.session.add_all(departments + titles)
+        db.session.flush()
+
+        manager = None
+        created = []
+        for i in range(EMPLOYEES):
+            employee = Employee(
+                employee_number=f'QB{i:04d}',
+                first_name='موظف',
+                last_name=f'اختبار {i}',
+                email=f'qb{i}@example.com',
+                national_id=f'QB-{i}',
+                hire_date=date(2024, 1, 1),
+                department_id=departments[i].id,
+                job_title_id=titles[i].id,
+                manager_id=manager.id if manager else None,
+                salary=10000
+            )
+            db.session.add(employee)
+            db.session.flush()
+            created.append(employee.id)
+            manager = employee
+        db.session.commit()
+        return created
+
+
+def _queries(client, headers, count_queries, url):
+    # طلب أول يملأ ذاكرة المستخدم المؤقتة حتى لا تُحتسب استعلاماتها
+    assert client.get(url, headers=headers).status_code == 200
+    with count_queries() as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return counter.count, response.get_json()['data']
+
+
+@pytest.mark.parametrize('mode', ['page', 'cursor'])
+def test_employee_list_query_budget_is_independent_of_page_size(
+    client, admin_headers, count_queries, employees, mode
+):
+    suffix = '&cursor=' if mode == 'cursor' else ''
+    small, small_data = _queries(client, admin_headers, count_queries, f'/api/employees/?limit=5{suffix}')
+    large, large_data = _queries(client, admin_headers, count_queries, f'/api/employees/?limit=50{suffix}')
+
+    assert len(small_data['employees']) == 5
+    assert len(large_data['employees']) == 50
+    assert all(row['manager_name'] for row in large_data['employees'])
+    assert small == large
+    assert large <= LIST_BUDGET
+
+
+def test_employee_detail_query_budget(client, admin_headers, count_queries, employees):
+    count, data = _queries(client, admin_headers, count_queries, f'/api/employees/{employees[-1]}')
+
+    assert data['department_name'] and data['job_title_name'] and data['manager_name']
+    assert count <= DETAIL_BUDGET
@@ -0,0 +1,3 @@
+"""
+أدوات مساعدة مشتركة بين المسارات
+"""
@@ -0,0 +1,31 @@
+"""
+توحيد النصوص العربية لأغراض البحث
+"""
+import re
+
+# التشكيل (فتحة، ضمة، كسرة، تنوين، شدة، سكون...) والألف الخنجرية
+_DIACRITICS = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+_TATWEEL = '\u0640'
+
+_FOLDS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    'ؤ': 'و',
+    'ئ': 'ي',
+})
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_arabic(text):
+    """إزالة التشكيل والتطويل وتوحيد أشكال الألف والهمزة والتاء المربوطة"""
+    if not text:
+        return ''
+    text = _DIACRITICS.sub('', str(text)).replace(_TATWEEL, '')
+    return text.translate(_FOLDS).lower()
+
+
+def search_tokens(text):
+    """تقسيم النص الموحد إلى كلمات بحث"""
+    return _TOKEN.findall(normalize_arabic(text))
@@ -0,0 +1,173 @@
+"""
+هوية المستخدم الحالي وصلاحياته على مستوى الطلب
+
+- التوكن يحمل رقم المستخدم فقط، والدور ورقم الموظف يُقرآن دائماً من جدول المستخدمين
+- المستخدم الحالي يُحمَّل عبر user_lookup_loader من ذاكرة مؤقتة لكل عملية بعمر قصير،
+  فلا يتم استعلام جدول المستخدمين في كل طلب، ومع ذلك يظهر تغيير الدور أو تعطيل
+  الحساب خلال AUTH_USER_CACHE_TTL ثانية على الأكثر
+- التوكنات الملغاة (jti) تُحفظ في جدول revoked_tokens وتُفحص من نسخة في الذاكرة
+  تُحدَّث تدريجياً كل AUTH_REVOCATION_REFRESH ثانية، فالحالة الشائعة (توكن غير ملغى)
+  لا تكلف أي استعلام
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import jsonify, current_app
+from flask_jwt_extended import get_current_user
+
+from config.database import db
+from models.user import User
+from models.revoked_token import RevokedToken
+
+
+class CurrentUser:
+    """نسخة خفيفة من بيانات المستخدم اللازمة للصلاحيات"""
+    __slots__ = ('id', 'role', 'employee_id', 'is_active')
+
+    def __init__(self, id, role, employee_id, is_active):
+        self.id = id
+        self.role = role
+        self.employee_id = employee_id
+        self.is_active = is_active
+
+    def __repr__(self):
+        return f'<CurrentUser {self.id} ({self.role})>'
+
+
+_users = {}
+_lock = threading.Lock()
+
+
+def load_user(user_id):
+    """تحميل المستخدم من الذاكرة المؤقتة أو من قاعدة البيانات عند انتهاء صلاحيتها"""
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    row = db.session.execute(
+        db.select(User.id, User.role, User.employee_id, User.is_active).where(User.id == user_id)
+    ).first()
+    user = CurrentUser(*row) if row else None
+
+    ttl = current_app.config.get('AUTH_USER_CACHE_TTL', 60)
+    with _lock:
+        if len(_users) > 10000:
+            _users.clear()
+        _users[user_id] = (now + ttl, user)
+    return user
+
+
+class RevocationList:
+    """نسخة لكل عملية من التوكنات الملغاة غير المنتهية (jti -> وقت الانتهاء)"""
+
+    # إعادة قراءة نافذة متداخلة حتى لا تفوت إلغاءات معاملات التزمت متأخرة
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expires = {}
+        self._since = None
+        self._next_refresh = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            utcnow = datetime.utcnow()
+            statement = db.select(
+                RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at
+            ).where(RevokedToken.expires_at > utcnow)
+            if self._since is not None:
+                statement = statement.where(RevokedToken.revoked_at >= self._since - self.OVERLAP)
+
+            since = self._since
+            for jti, expires_at, revoked_at in db.session.execute(statement):
+                self._expires[jti] = expires_at
+                if revoked_at and (since is None or revoked_at > since):
+                    since = revoked_at
+            self._since = since or utcnow
+
+            for jti in [jti for jti, expires_at in self._expires.items() if expires_at <= utcnow]:
+                del self._expires[jti]
+            self._next_refresh = now + current_app.config.get('AUTH_REVOCATION_REFRESH', 5)
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._expires[jti] = expires_at
+
+    def __contains__(self, jti):
+        self._refresh()
+        return jti in self._expires
+
+    def __len__(self):
+        return len(self._expires)
+
+
+revoked_tokens = RevocationList()
+
+
+def revoke_token(jwt_payload):
+    """إلغاء توكن (يُحفظ في قاعدة البيانات ويُضاف فوراً لنسخة هذه العملية)"""
+    exp = jwt_payload.get('exp')
+    expires_at = datetime.utcfromtimestamp(exp) if exp else datetime.max
+    if not db.session.execute(
+        db.select(RevokedToken.id).where(RevokedToken.jti == jwt_payload['jti'])
+    ).first():
+        db.session.add(RevokedToken(
+            jti=jwt_payload['jti'],
+            user_id=int(jwt_payload['sub']) if jwt_payload.get('sub') else None,
+            expires_at=expires_at
+        ))
+    db.session.commit()
+    revoked_tokens.add(jwt_payload['jti'], expires_at)
+
+
+def init_auth(jwt):
+    """تسجيل محمّلات المستخدم في JWTManager"""
+
+    @jwt.user_lookup_loader
+    def _lookup_user(jwt_header, jwt_data):
+        user = load_user(int(jwt_data['sub']))
+        if user is None or not user.is_active:
+            return None
+        return user
+
+    @jwt.token_in_blocklist_loader
+    def _token_revoked(jwt_header, jwt_data):
+        return jwt_data.get('jti') in revoked_tokens
+
+    @jwt.revoked_token_loader
+    def _revoked_token(jwt_header, jwt_data):
+        return jsonify({
+            'success': False,
+            'message': 'انتهت الجلسة، الرجاء تسجيل الدخول مرة أخرى'
+        }), 401
+
+    @jwt.user_lookup_error_loader
+    def _user_lookup_error(jwt_header, jwt_data):
+        return jsonify({
+            'success': False,
+            'message': 'المستخدم غير موجود أو تم تعطيل الحساب'
+        }), 401
+
+
+def roles_required(*roles, message='ليس لديك صلاحية'):
+    """مزخرف للتحقق من دور المستخدم (يوضع بعد jwt_required)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if get_current_user().role not in roles:
+                return jsonify({
+                    'success': False,
+                    'message': message
+                }), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
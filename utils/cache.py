@@ -0,0 +1,104 @@
+"""
+تخزين مؤقت للإحصائيات مع إبطال عند الكتابة
+
+كل عملية (worker) تحتفظ بنسخة محلية، وصلاحيتها مرتبطة بعداد جيل في قاعدة البيانات
+(جدول cache_generations) يزداد داخل نفس معاملة الكتابة، مع TTL كشبكة أمان.
+"""
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.orm import Session
+
+from config.database import db
+from models.cache_generation import CacheGeneration
+from models.employee import Employee
+from models.department import Department
+from utils.sql import dialect_insert
+
+
+class GenerationCache:
+    """ذاكرة مؤقتة محلية للعملية مرتبطة بجيل مشترك في قاعدة البيانات"""
+
+    def __init__(self, name, default_ttl=300):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return current_app.config.get('STATS_CACHE_TTL', self.default_ttl)
+
+    def current_generation(self):
+        """قراءة الجيل الحالي (استعلام واحد بالمفتاح الأساسي)"""
+        return self.current_version()[0]
+
+    def current_version(self):
+        """(الجيل، وقت آخر زيادة) - يصلح كإصدار للجدول في ETag / Last-Modified"""
+        row = db.session.execute(
+            db.select(CacheGeneration.generation, CacheGeneration.updated_at)
+            .where(CacheGeneration.name == self.name)
+        ).first()
+        return (row.generation, row.updated_at) if row else (0, None)
+
+    def get_or_compute(self, key, compute):
+        """إرجاع القيمة المخزنة إذا كان جيلها حالياً ولم تنتهِ صلاحيتها، وإلا حسابها"""
+        generation = self.current_generation()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == generation and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (generation, now + self.ttl, value)
+        return value
+
+    def bump(self, connection):
+        """زيادة الجيل داخل المعاملة الحالية (يبطل النسخ في جميع العمليات عند الالتزام)"""
+        # عبارة واحدة INSERT ... ON CONFLICT DO UPDATE: لا سباق بين معاملتين تنشئان الصف معاً
+        statement = dialect_insert(CacheGeneration).values(
+            name=self.name, generation=1, updated_at=datetime.utcnow()
+        )
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['name'],
+            set_={
+                'generation': CacheGeneration.generation + 1,
+                'updated_at': statement.excluded.updated_at
+            }
+        ))
+
+    def invalidate(self):
+        """إبطال صريح للكتابات الجماعية التي لا تمر عبر وحدة عمل ORM"""
+        self.bump(db.session.connection())
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'name': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0,
+                'entries': len(self._entries)
+            }
+
+
+stats_cache = GenerationCache('stats')
+
+_STATS_MODELS = (Employee, Department)
+
+
+@db.event.listens_for(Session, 'after_flush')
+def _invalidate_stats(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, _STATS_MODELS) for obj in changed):
+        stats_cache.bump(session.connection())
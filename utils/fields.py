@@ -0,0 +1,55 @@
+"""
+الحقول الجزئية (?fields=) للقوائم والتفاصيل
+
+يتم دفع الإسقاط إلى جملة SELECT عبر load_only بدلاً من قص القاموس بعد التحميل،
+فلا تُقرأ ولا تُنشأ إلا الأعمدة المطلوبة.
+"""
+from datetime import datetime, date, time
+
+from config.database import db
+
+
+class InvalidFields(ValueError):
+    """حقول غير معروفة في معامل fields"""
+
+
+def _columns(model):
+    return {column.key for column in db.inspect(model).column_attrs}
+
+
+def parse_fields(model, raw):
+    """تحليل معامل fields (مفصولة بفواصل)، يعيد قائمة الحقول أو None إذا لم يُحدد"""
+    if not raw:
+        return None
+
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    allowed = _columns(model) | set(getattr(model, 'computed_fields', {}))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidFields(f"حقول غير معروفة: {', '.join(unknown)}")
+
+    # المعرف يُرجع دائماً
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def load_only_option(model, fields, extra=()):
+    """خيار load_only للأعمدة المطلوبة واعتماديات الحقول المحسوبة"""
+    computed = getattr(model, 'computed_fields', {})
+    columns = _columns(model)
+
+    needed = set(extra)
+    for name in fields:
+        needed.update(computed.get(name, (name,)))
+
+    return db.load_only(*[getattr(model, name) for name in sorted(needed & columns)])
+
+
+def serialize(obj, fields):
+    """قاموس بالحقول المطلوبة فقط (بنفس تنسيق to_dict للتواريخ)"""
+    data = {}
+    for name in fields:
+        value = getattr(obj, name)
+        if isinstance(value, (datetime, date, time)):
+            value = value.isoformat()
+        data[name] = value
+    return data
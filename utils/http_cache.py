@@ -0,0 +1,82 @@
+"""
+الطلبات الشرطية (ETag / Last-Modified) والرد بـ 304
+
+- validators تُحسب بتكلفة زهيدة: إما من إصدار الجدول (عداد الجيل)، أو من count
+  و max(updated_at) للاستعلام المفلتر، أو من صفحة النتائج نفسها بعد تحميلها
+  (للقوائم الكبيرة بالمؤشر - التكلفة بحجم الصفحة لا بعدد الصفوف المطابقة)
+- ETag يتضمن المسار ومعاملات الطلب وهوية المستخدم لأن القوائم تختلف حسب الصلاحيات
+- القوائم المفلترة تعتمد على ETag فقط: max(updated_at) لا يتغير عند حذف صف أو خروجه
+  من الفلتر، فـ If-Modified-Since وحده قد يعطي 304 قديماً
+"""
+import hashlib
+from datetime import timezone
+
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+
+from config.database import db
+
+
+class Validators:
+    """قيمتا ETag و Last-Modified لاستجابة"""
+
+    def __init__(self, version, last_modified=None):
+        identity = get_jwt_identity()
+        raw = repr((request.full_path, identity, version))
+        self.etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+        self.last_modified = last_modified
+
+    def is_fresh(self):
+        """هل نسخة العميل ما زالت صالحة؟ (If-None-Match له الأولوية على If-Modified-Since)"""
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        since = request.if_modified_since
+        # المقارنة بدقة تاريخ HTTP (ثوانٍ كاملة) كما يرسل Last-Modified (RFC 9110)
+        if since and self.last_modified:
+            return self.last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+        return False
+
+    def apply(self, response):
+        response.set_etag(self.etag, weak=True)
+        if self.last_modified:
+            response.last_modified = self.last_modified.replace(tzinfo=timezone.utc)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Authorization')
+        return response
+
+    def not_modified(self):
+        return self.apply(make_response('', 304))
+
+
+def version_validators(cache, *extra):
+    """validators من إصدار الجدول (عداد الجيل) - استعلام واحد بالمفتاح الأساسي"""
+    generation, updated_at = cache.current_version()
+    return Validators((generation,) + extra, updated_at)
+
+
+def query_validators(query, model, *extra_columns):
+    """validators (ETag فقط) من count و max(updated_at) للاستعلام المفلتر دون تحميل الصفوف"""
+    row = query.with_entities(
+        db.func.count(model.id),
+        db.func.max(model.updated_at),
+        *extra_columns
+    ).order_by(None).one()
+    return Validators(tuple(row))
+
+
+def page_validators(records, *extra, related=None):
+    """
+    validators (ETag فقط) من صفحة النتائج المحملة: (id, updated_at) لكل صف ولصفوفه
+    المرتبطة الظاهرة في الرد (related(record))، مع extra مثل next_cursor
+    """
+    version = tuple(
+        (row.id, row.updated_at) if row is not None else None
+        for record in records
+        for row in (record,) + tuple(related(record) if related else ())
+    )
+    return Validators((version,) + extra)
+
+
+def max_updated_at(model, *criteria):
+    """عمود فرعي max(updated_at) لجدول مرتبط (مثل أسماء الموظفين في سجلات الحضور)"""
+    return db.select(db.func.max(model.updated_at)).where(*criteria).scalar_subquery()
@@ -0,0 +1,109 @@
+"""
+أدوات التقسيم إلى صفحات (Pagination)
+
+- وضع الإزاحة التقليدي (page/limit) للعملاء القدامى
+- وضع المؤشر (Keyset/Cursor) للقوائم الكبيرة: لا يستخدم OFFSET ولا COUNT
+"""
+import base64
+import json
+import time
+from datetime import datetime, date
+
+from config.database import db
+
+
+class InvalidCursor(ValueError):
+    """مؤشر تقسيم غير صالح"""
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return {'t': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 't' in value:
+        raw = value['t']
+        return datetime.fromisoformat(raw) if 'T' in raw else date.fromisoformat(raw)
+    return value
+
+
+def encode_cursor(values):
+    """ترميز قيم مفتاح الترتيب في مؤشر نصي معتم"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """فك ترميز المؤشر والتحقق من عدد القيم"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('مؤشر الصفحة غير صالح')
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(column, value, nullable):
+    """الصفوف التي تأتي بعد value في ترتيب تنازلي (NULL في النهاية للأعمدة التي تقبله)"""
+    if value is None:
+        return db.false()
+    if nullable:
+        return db.or_(column < value, column.is_(None))
+    return column < value
+
+
+def keyset_paginate(query, columns, cursor=None, limit=50, nullable=()):
+    """
+    تقسيم بالمؤشر على أعمدة ترتيب تنازلية (آخرها مفتاح فريد مثل id)
+
+    nullable: الأعمدة التي قد تحتوي NULL (تأتي صفوفها في نهاية الترتيب)
+    يعيد (العناصر، المؤشر التالي أو None)
+    """
+    nullable = {column.key for column in nullable}
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        # (a, b) < (x, y)  ⇔  a < x OR (a = x AND b < y) ...
+        conditions = []
+        for i, column in enumerate(columns):
+            prefix = [_equal(columns[j], values[j]) for j in range(i)]
+            conditions.append(db.and_(*prefix, _after(column, values[i], column.key in nullable)))
+        query = query.filter(db.or_(*conditions))
+
+    order = [
+        column.desc().nulls_last() if column.key in nullable else column.desc()
+        for column in columns
+    ]
+    items = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+
+    return items, next_cursor
+
+
+_count_cache = {}
+
+
+def cached_count(key, query, ttl=60):
+    """عدد تقريبي مخزن مؤقتاً لكل مجموعة فلاتر (يتجنب COUNT في كل طلب)"""
+    now = time.monotonic()
+    entry = _count_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    total = query.order_by(None).count()
+    if len(_count_cache) > 1024:
+        _count_cache.clear()
+    _count_cache[key] = (now + ttl, total)
+    return total
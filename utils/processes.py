@@ -0,0 +1,15 @@
+"""
+مجمعات العمليات داخل خادم متعدد الخيوط
+"""
+import multiprocessing
+
+
+def pool_context():
+    """
+    سياق إنشاء العمليات بدون fork (forkserver إن توفر، وإلا spawn)
+
+    fork من عملية بها خيوط طلبات واتصالات قاعدة بيانات مفتوحة قد يورث أقفالاً
+    محجوزة في العملية الابنة. العمليات الجديدة تستورد دالة العمل من وحدتها فقط
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
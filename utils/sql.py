@@ -0,0 +1,70 @@
+"""
+عبارات SQL تختلف بين قواعد البيانات المدعومة (SQLite و PostgreSQL)
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.database import db
+
+_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+
+def dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def dialect_insert(model):
+    """INSERT يدعم ON CONFLICT حسب قاعدة البيانات الحالية"""
+    dialect = dialect_name()
+    if dialect not in _INSERTS:
+        raise NotImplementedError(f'ON CONFLICT غير مدعوم في {dialect}')
+    return _INSERTS[dialect](model)
+
+
+def insert_ignore(model, index_elements):
+    """INSERT ... ON CONFLICT (index_elements) DO NOTHING"""
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def least(a, b):
+    """أصغر القيمتين مع تجاهل NULL"""
+    if dialect_name() == 'postgresql':
+        return db.func.least(a, b)
+    return db.func.min(db.func.coalesce(a, b), db.func.coalesce(b, a))
+
+
+def greatest(a, b):
+    """أكبر القيمتين مع تجاهل NULL"""
+    if dialect_name() == 'postgresql':
+        return db.func.greatest(a, b)
+    return db.func.max(db.func.coalesce(a, b), db.func.coalesce(b, a))
+
+
+def hours_between(start, end):
+    """
+    عدد الساعات (لأقرب منزلتين) بين وقتين من نفس اليوم، NULL إذا كان أحدهما NULL
+
+    خروج قبل الدخول (مناوبة تعبر منتصف الليل أو بصمة خاطئة) يعطي 0 وليس قيمة سالبة
+    """
+    if dialect_name() == 'postgresql':
+        seconds = db.extract('epoch', end - start)
+        hours = db.func.round(db.cast(seconds / 3600, db.Numeric), 2)
+    else:
+        hours = db.func.round((db.func.julianday(end) - db.func.julianday(start)) * 24, 2)
+    return db.case((hours < 0, 0), else_=hours)
+
+
+def day_number(column):
+    """التاريخ كعدد أيام منذ 1970-01-01 (عدد صحيح)"""
+    if dialect_name() == 'postgresql':
+        return column - db.cast(db.literal('1970-01-01'), db.Date)
+    return db.cast(db.func.julianday(column) - 2440587.5, db.Integer)
+
+
+def seconds_of_day(column):
+    """الوقت كعدد الثواني منذ منتصف الليل، NULL إذا كان NULL"""
+    if dialect_name() == 'postgresql':
+        return db.extract('epoch', column)
+    return db.func.round((db.func.julianday(column) - db.func.julianday('00:00:00')) * 86400)
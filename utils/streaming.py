@@ -0,0 +1,48 @@
+"""
+أدوات الاستجابات المتدفقة (CSV / NDJSON)
+"""
+import csv
+import io
+import json
+from datetime import datetime, date, time
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_lines(batches):
+    """تحويل دفعات من القواميس إلى أسطر NDJSON (سطر لكل سجل)"""
+    for batch in batches:
+        yield ''.join(
+            json.dumps(item, ensure_ascii=False, default=_json_default) + '\n'
+            for item in batch
+        )
+
+
+def csv_lines(header, batches, bom=True):
+    """
+    تحويل دفعات من الصفوف إلى نص CSV
+
+    bom: يبدأ الملف بـ BOM ليتعرف Excel على الترميز العربي (بدونه للملفات التي تقرؤها أنظمة أخرى)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if bom:
+        buffer.write('\ufeff')
+    writer.writerow(header)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([
+                value.isoformat() if isinstance(value, (datetime, date, time)) else value
+                for value in row
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()